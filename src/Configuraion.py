@@ -21,6 +21,13 @@ class ConfigFile:
                 return item.value
         raise Exception(f'ERR: config item {name} not recognized')
 
+    def set(self, name: str, value):
+        for item in self.config_items:
+            if item.name == name:
+                item.value = value
+                return
+        self.config_items += [ConfigItem(name, value)]
+
     def has(self, name: str):
         for item in self.config_items:
             if item.name == name:
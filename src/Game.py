@@ -1,12 +1,17 @@
 import curses
 import curses.textpad as textpad
 import json
+import logging
 from math import sqrt
 import os
+from collections import deque
+from time import perf_counter
 from Configuraion import ConfigFile
+from Profiler import profiler
+from ScriptProfiler import script_profiler, BLOCKING_OPCODES
 
 from ncursesui.Elements import Menu, Window, Button, UIElement, Widget, TextField, WordChoice, Separator
-from ncursesui.Utility import calc_pretty_bars, draw_separator, message_box, cct_len, draw_borders, drop_down_box, put, MULTIPLE_ELEMENTS, show_controls_window, str_smart_split
+from ncursesui.Utility import calc_pretty_bars, draw_separator, message_box, draw_borders, drop_down_box, put, MULTIPLE_ELEMENTS, show_controls_window, str_smart_split
 from gamelib.Cooking import CursesCooking
 
 # import gamelib.Entities as Entities
@@ -16,6 +21,14 @@ import gamelib.Room as Room
 import gamelib.Items as Items
 import gamelib.Map as Map
 import gamelib.SaveFile as SaveFile
+import gamelib.Content as Content
+from gamelib.TileRenderer import TileRenderer
+import gamelib.FOV as FOV
+import gamelib.Render as Render
+import gamelib.Script as Script
+import gamelib.EnvVars as EnvVars
+import gamelib.Markup as Markup
+import gamelib.Triggers as Triggers
 
 # from gamelib.Entities import Player, Enemy
 from gamelib.Combat import CombatEncounter
@@ -27,25 +40,51 @@ def distance(ay: int, ax: int, by: int, bx: int):
 class GameLog:
     MAX_SIZE = 20
     def __init__(self):
-        self.messages = []
+        # each entry is [message, {width: wrapped lines}], the oldest entries fall off after MAX_SIZE
+        self.entries = deque(maxlen=GameLog.MAX_SIZE)
 
     def add(self, messages: list):
         for i in range(len(messages)):
             messages[i] = '- ' + messages[i]
-        self.messages += messages
+        for message in messages:
+            self.entries.append([message, dict()])
+
+    def load(self, messages: list):
+        self.entries.clear()
+        for message in messages:
+            self.entries.append([message, dict()])
+
+    def json(self):
+        return [entry[0] for entry in self.entries]
 
     def length(self):
-        return len(self.messages)
+        return len(self.entries)
 
-    def get_splits(self, max_width: int):
-        splits = []
-        for message in self.messages:
-            splits += str_smart_split(message, max_width)
-        return splits
+    def get_wrapped(self, entry: list, max_width: int):
+        if not max_width in entry[1]:
+            entry[1][max_width] = str_smart_split(entry[0], max_width)
+        return entry[1][max_width]
+
+    def get_lines(self, max_width: int, first: int, amount: int):
+        # amount lines starting from line first, only the messages that are reached get wrapped
+        result = []
+        line = 0
+        for entry in self.entries:
+            lines = self.get_wrapped(entry, max_width)
+            if line + len(lines) > first:
+                result += lines[max(0, first - line):]
+                if len(result) >= amount:
+                    break
+            line += len(lines)
+        return result[:amount]
 
     def get_last(self, max_width: int, amount: int):
-        # optimize
-        return self.get_splits(max_width)[-amount:]
+        result = []
+        for entry in reversed(self.entries):
+            if len(result) >= amount:
+                break
+            result = self.get_wrapped(entry, max_width) + result
+        return result[-amount:]
 
 class Game:
     controls = {
@@ -74,8 +113,44 @@ class Game:
             sp = self.config_file.get('Saves path')
             raise Exception(f'ERR: save file of character with name {character_name} not found in {sp}')
         self.player = Player.from_json(data['player'], self.config_file)
-        self.env_vars = data['env_vars']
+        self.env_vars = EnvVars.EnvVars(data['env_vars'])
         self.last_command = ''
+        # opcode -> handler, the room scripts are compiled to these when the room is loaded
+        self.script_ops = {
+            'comment': self.op_comment,
+            'error': self.op_error,
+            'unknown': self.op_unknown,
+            'run': self.op_run,
+            'set': self.op_set,
+            'unset': self.op_unset,
+            'add': self.op_add,
+            'add_item': self.op_add_item,
+            'sub': self.op_sub,
+            'mb': self.op_mb,
+            'notify': self.op_notify,
+            'say': self.op_say,
+            'log': self.op_log,
+            'move': self.op_move,
+            'kill': self.op_kill,
+            'revive': self.op_revive,
+            'sleep': self.op_sleep,
+            'clear': self.op_clear,
+            'if': self.op_if,
+            'fight': self.op_fight,
+            'trade': self.op_trade,
+            'draw': self.op_draw,
+            'stop': self.op_stop,
+            'return': self.op_return
+        }
+        # player values scripts can read, they shadow env vars with the same names
+        self.env_vars.bind('player.health', lambda: self.player.health)
+        self.env_vars.bind('player.max_health', lambda: self.player.get_max_health())
+        self.env_vars.bind('player.mana', lambda: self.player.mana)
+        self.env_vars.bind('player.max_mana', lambda: self.player.get_max_mana())
+        self.env_vars.bind('player.name', lambda: self.player.name)
+        self.env_vars.bind('player.y', lambda: self.player_y)
+        self.env_vars.bind('player.x', lambda: self.player_x)
+        self.env_vars.bind('player.gold', lambda: self.player.gold)
         self.game_room = Room.Room.by_name(data['room_name'], self.config_file, self.env_vars)
 
         self.player_y, self.player_x = self.game_room.player_spawn_y, self.game_room.player_spawn_x
@@ -83,6 +158,9 @@ class Game:
             self.player_y = data['player_y']
         if 'player_x' in data:
             self.player_x = data['player_x']
+        self.triggers = Triggers.RoomTriggers(self.game_room, self.env_vars, self.player_y, self.player_x)
+        # number of script instructions that did something, used to tell if _tick can be skipped
+        self.script_effects = 0
 
         # set some values
         self.tile_window_height = self.parent.HEIGHT * 5 // 6
@@ -103,39 +181,49 @@ class Game:
         self.log_window_height = self.parent.HEIGHT - self.tile_window_height
         self.log_window_width = self.tile_window_width
         self.game_log = GameLog()
-        self.game_log.messages = data['game_log']
+        self.game_log.load(data['game_log'])
 
         self.mid_y = self.tile_window_height // 2 
         self.mid_x = self.tile_window_width // 2
+
+        # last drawn contents of the panels, a panel is only redrawn when its contents change
+        self.panel_signatures = {}
+        # which enemies the player can see, valid until the player, the room or the enemies change
+        self.enemy_visibility_key = None
+        self.enemy_visibility = {}
+        # created once, only remade when a new stage shows up
+        self.profiler_window = None
             
     def start(self):
         self.window.erase()
-        self.window.refresh()
+        Render.compositor.stage(self.window)
 
         # room tile window
-        self.tile_window = curses.newwin(self.tile_window_height, self.tile_window_width, 0, 0)
+        self.tile_window = Render.newwin(self.tile_window_height, self.tile_window_width, 0, 0)
         self.tile_window.keypad(1)
         draw_borders(self.tile_window)
+        self.tile_renderer = TileRenderer(self.tile_window, 1, 1, self.tile_window_height - 2, self.tile_window_width - 2)
         # self.tile_window.nodelay(True)
         # self.tile_window.timeout(self.game_speed)
 
         # player info window
-        self.player_info_window = curses.newwin(self.player_info_window_height, self.player_info_window_width, 0, self.tile_window_width + 1)
+        self.player_info_window = Render.newwin(self.player_info_window_height, self.player_info_window_width, 0, self.tile_window_width + 1)
         
         # mini map window
-        self.mini_map_window = curses.newwin(self.MINI_MAP_HEIGHT + 2, self.MINI_MAP_WIDTH + 2, 13, self.parent.WIDTH - self.MINI_MAP_WIDTH - 2)
+        self.mini_map_window = Render.newwin(self.MINI_MAP_HEIGHT + 2, self.MINI_MAP_WIDTH + 2, 13, self.parent.WIDTH - self.MINI_MAP_WIDTH - 2)
 
         # log window
-        self.log_window = curses.newwin(self.log_window_height, self.log_window_width, self.tile_window_height, 0)
+        self.log_window = Render.newwin(self.log_window_height, self.log_window_width, self.tile_window_height, 0)
 
         self.full_map = None
         if self.config_file.has('Map path'):
             self.full_map = Map.Map(self.config_file.get('Map path'))
+            self.full_map.attach(self.env_vars)
         
         self.draw()
 
         if '_load' in self.game_room.scripts:
-            self.exec_script('_load', self.game_room.scripts)
+            self.exec_script('_load', self.game_room.compiled_scripts)
 
         # main game loop
         self.main_game_loop()
@@ -150,135 +238,166 @@ class Game:
 
         while self.game_running:
             # check if there is a tick script in current room
-            if '_tick' in self.game_room.scripts:
-                self.exec_script('_tick', self.game_room.scripts)
+            if '_tick' in self.game_room.scripts and self.triggers.should_tick():
+                with profiler.stage('_tick'):
+                    effects = self.script_effects
+                    self.exec_script('_tick', self.game_room.compiled_scripts)
+                    self.triggers.tick_finished(self.script_effects != effects)
+            self.run_triggers()
+
+            # everything drawn during the turn reaches the terminal at once
+            Render.compositor.flush()
+            Render.compositor.end_turn()
 
             # get player input
-            key = self.window.getch()
-            if key == 81 and self.tile_message_box('Are you sure you want to quit? (Progress will be saved)', ['No', 'Yes']) == 'Yes':
-                self.save_enemy_env_vars()
-                SaveFile.save(self.player, self.game_room.name, self.config_file.get('Saves path'), player_y=self.player_y, player_x=self.player_x, env_vars=self.env_vars, game_log_messages=self.game_log.messages)
-                break
-            if key == 126: # ~
-                update_entities = False
-                command = self.get_terminal_command()
-                self.exec_line(command, self.game_room.scripts)
-            if key == 63:
-                show_controls_window(self.parent, Game.controls)
-                self.draw()
-                continue
-            # movement management
-            y_lim = self.game_room.height
-            x_lim = self.game_room.width
-            # North
-            if key in [56, 259] and not self.player_y < 0 and not self.game_room.tiles[self.player_y - 1][self.player_x].solid:
-                self.player_y -= 1
-                entered_room = True
-            # South
-            if key in [50, 258] and not self.player_y >= y_lim and not self.game_room.tiles[self.player_y + 1][self.player_x].solid:
-                self.player_y += 1
-                entered_room = True
-            # West
-            if key in [52, 260] and not self.player_x < 0 and not self.game_room.tiles[self.player_y][self.player_x - 1].solid:
-                self.player_x -= 1
-                entered_room = True
-            # East
-            if key in [54, 261] and not self.player_x >= x_lim and not self.game_room.tiles[self.player_y][self.player_x + 1].solid:
-                self.player_x += 1
-                entered_room = True
-            # NE
-            if key in [117, 57] and not (self.player_y < 0 and not self.player_x >= x_lim) and not self.game_room.tiles[self.player_y - 1][self.player_x + 1].solid:
-                self.player_y -= 1
-                self.player_x += 1
-                entered_room = True
-            # NW
-            if key in [121, 55] and not (self.player_y < 0 and self.player_x < 0) and not self.game_room.tiles[self.player_y - 1][self.player_x - 1].solid:
-                self.player_y -= 1
-                self.player_x -= 1
-                entered_room = True
-            # SW
-            if key in [98, 49] and not (self.player_y >= y_lim and self.player_x < 0) and not self.game_room.tiles[self.player_y + 1][self.player_x - 1].solid:
-                self.player_y += 1
-                self.player_x -= 1
-                entered_room = True
-            # SE
-            if key in [110, 51] and not (self.player_y >= y_lim and self.player_x >= x_lim) and not self.game_room.tiles[self.player_y + 1][self.player_x + 1].solid:
-                self.player_y += 1
-                self.player_x += 1
-                entered_room = True
-            # open big log window
-            if key == 76: # L
-                self.open_big_log_window()
-                continue
-            # interact
-            if key == 101: # e
-                interactable_tiles = self.get_interactable_tiles(self.player_y, self.player_x)
-                # if len(interactable_tiles) == 0:
-                #     message_box(self.parent, 'No tiles to interact with nearby!', ['Ok'],width=self.tile_window_width - 4, ypos=2, xpos=2)
-                # else:
-                interact_key = self.get_prompt('Interact where?')
-                flag = False
-                i_tile = None
-                for o in interactable_tiles:
-                    if interact_key in o[1]:
-                        flag = True
-                        i_tile = o[0]
-                if flag:
-                    if isinstance(i_tile, Room.ChestTile):
-                        self.interact_with_chest(i_tile)
-                    if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.ChestTile):
-                        self.interact_with_chest(i_tile.actual_tile)
-                    if isinstance(i_tile, Room.CookingPotTile):
-                        self.initiate_cooking()
-                    if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.CookingPotTile):
-                        self.initiate_cooking()
-                    if isinstance(i_tile, Room.ScriptTile):
-                        self.exec_script(i_tile.script_name, self.game_room.scripts)
-                    if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.ScriptTile):
-                        self.exec_script(i_tile.actual_tile.script_name, self.game_room.scripts)
-                else:
-                    self.game_log.add(['Can\'t interact with that'])
-            # open inventory
-            if key == 105: # i
-                self.draw_inventory()
-                update_entities = False
-            # initiate combat
-            if key == 99: # c
-                if encounter_ready:
-                    self.initiate_encounter_with(encounter_enemy_code)
-                else:
-                    self.tile_message_box('You are not within range to attack anybody!', ['Ok'])
-            # enter tile description mode
-            if key == 120: # x
-                update_entities = False
+            key = self.wait_for_key()
+            with profiler.stage('input'):
+                # time spent in modal screens is reported as 'modal', not as part of 'input'
+                if key == 81:
+                    with profiler.wait('modal'):
+                        answer = self.tile_message_box('Are you sure you want to quit? (Progress will be saved)', ['No', 'Yes'])
+                    if answer == 'Yes':
+                        self.save_enemy_env_vars()
+                        SaveFile.save(self.player, self.game_room.name, self.config_file.get('Saves path'), player_y=self.player_y, player_x=self.player_x, env_vars=self.env_vars.json(), game_log_messages=self.game_log.json())
+                        break
+                if key == 126: # ~
+                    update_entities = False
+                    with profiler.wait('modal'):
+                        command = self.get_terminal_command()
+                    self.exec_line(command, self.game_room.compiled_scripts)
+                if key == 63:
+                    with profiler.wait('modal'):
+                        show_controls_window(self.parent, Game.controls)
+                    self.draw()
+                    continue
+                # movement management
+                y_lim = self.game_room.height
+                x_lim = self.game_room.width
+                # North
+                if key in [56, 259] and not self.player_y < 0 and not self.game_room.is_solid(self.player_y - 1, self.player_x):
+                    self.player_y -= 1
+                    entered_room = True
+                # South
+                if key in [50, 258] and not self.player_y >= y_lim and not self.game_room.is_solid(self.player_y + 1, self.player_x):
+                    self.player_y += 1
+                    entered_room = True
+                # West
+                if key in [52, 260] and not self.player_x < 0 and not self.game_room.is_solid(self.player_y, self.player_x - 1):
+                    self.player_x -= 1
+                    entered_room = True
+                # East
+                if key in [54, 261] and not self.player_x >= x_lim and not self.game_room.is_solid(self.player_y, self.player_x + 1):
+                    self.player_x += 1
+                    entered_room = True
+                # NE
+                if key in [117, 57] and not (self.player_y < 0 and not self.player_x >= x_lim) and not self.game_room.is_solid(self.player_y - 1, self.player_x + 1):
+                    self.player_y -= 1
+                    self.player_x += 1
+                    entered_room = True
+                # NW
+                if key in [121, 55] and not (self.player_y < 0 and self.player_x < 0) and not self.game_room.is_solid(self.player_y - 1, self.player_x - 1):
+                    self.player_y -= 1
+                    self.player_x -= 1
+                    entered_room = True
+                # SW
+                if key in [98, 49] and not (self.player_y >= y_lim and self.player_x < 0) and not self.game_room.is_solid(self.player_y + 1, self.player_x - 1):
+                    self.player_y += 1
+                    self.player_x -= 1
+                    entered_room = True
+                # SE
+                if key in [110, 51] and not (self.player_y >= y_lim and self.player_x >= x_lim) and not self.game_room.is_solid(self.player_y + 1, self.player_x + 1):
+                    self.player_y += 1
+                    self.player_x += 1
+                    entered_room = True
+                # open big log window
+                if key == 76: # L
+                    with profiler.wait('modal'):
+                        self.open_big_log_window()
+                    continue
+                # interact
+                if key == 101: # e
+                    interactable_tiles = self.get_interactable_tiles(self.player_y, self.player_x)
+                    # if len(interactable_tiles) == 0:
+                    #     message_box(self.parent, 'No tiles to interact with nearby!', ['Ok'],width=self.tile_window_width - 4, ypos=2, xpos=2)
+                    # else:
+                    with profiler.wait('modal'):
+                        interact_key = self.get_prompt('Interact where?')
+                    flag = False
+                    i_tile = None
+                    for o in interactable_tiles:
+                        if interact_key in o[1]:
+                            flag = True
+                            i_tile = o[0]
+                    if flag:
+                        with profiler.wait('modal'):
+                            if isinstance(i_tile, Room.ChestTile):
+                                self.interact_with_chest(i_tile)
+                            if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.ChestTile):
+                                self.interact_with_chest(i_tile.actual_tile)
+                            if isinstance(i_tile, Room.CookingPotTile):
+                                self.initiate_cooking()
+                            if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.CookingPotTile):
+                                self.initiate_cooking()
+                        if isinstance(i_tile, Room.ScriptTile):
+                            self.exec_script(i_tile.script_name, self.game_room.compiled_scripts)
+                        if isinstance(i_tile, Room.HiddenTile) and isinstance(i_tile.actual_tile, Room.ScriptTile):
+                            self.exec_script(i_tile.actual_tile.script_name, self.game_room.compiled_scripts)
+                    else:
+                        self.game_log.add(['Can\'t interact with that'])
+                # open inventory
+                if key == 105: # i
+                    with profiler.wait('modal'):
+                        self.draw_inventory()
+                    update_entities = False
+                # initiate combat
+                if key == 99: # c
+                    with profiler.wait('modal'):
+                        if encounter_ready:
+                            self.initiate_encounter_with(encounter_enemy_code)
+                        else:
+                            self.tile_message_box('You are not within range to attack anybody!', ['Ok'])
+                # enter tile description mode
+                if key == 120: # x
+                    update_entities = False
             if self.game_running:
-                tile = self.game_room.tiles[self.player_y][self.player_x]
+                tile = self.game_room.tile_at(self.player_y, self.player_x)
                 if isinstance(tile, Room.DoorTile) and entered_room:
                     entered_room = False
                     destination_room = tile.to
                     door_code = tile.door_code
                     self.set_env_var('_last_door_code', door_code)
+                    self.game_room.detach()
+                    self.triggers.detach()
                     self.game_room = Room.Room.by_name(destination_room, self.config_file, door_code=door_code, env_vars=self.env_vars)
                     self.player_y, self.player_x = self.game_room.player_spawn_y, self.game_room.player_spawn_x
+                    self.triggers = Triggers.RoomTriggers(self.game_room, self.env_vars, self.player_y, self.player_x)
                     self.tile_window.erase()
-                    self.tile_window.refresh()
+                    Render.compositor.stage(self.tile_window)
+                    self.tile_renderer.invalidate()
                     if '_load' in self.game_room.scripts:
-                        self.exec_script('_load', self.game_room.scripts)
+                        self.exec_script('_load', self.game_room.compiled_scripts)
                     if '_enter' in self.game_room.scripts:
-                        self.exec_script('_enter', self.game_room.scripts)
+                        self.exec_script('_enter', self.game_room.compiled_scripts)
                 if isinstance(tile, Room.PressurePlateTile):
-                    self.exec_script(tile.script_name, self.game_room.scripts)
-                if isinstance(tile, Room.HiddenTile) and self.get_env_var(tile.signal) == True and isinstance(tile.actual_tile, Room.PressurePlateTile):
-                    self.exec_script(tile.actual_tile.script_name, self.game_room.scripts)       
+                    self.exec_script(tile.script_name, self.game_room.compiled_scripts)
+                if isinstance(tile, Room.HiddenTile) and tile.signal in self.game_room.signal_state and isinstance(tile.actual_tile, Room.PressurePlateTile):
+                    self.exec_script(tile.actual_tile.script_name, self.game_room.compiled_scripts)       
+
+                self.triggers.enter_cell(self.player_y, self.player_x)
+                self.triggers.end_turn()
+                self.triggers.queue_timers()
+                self.run_triggers()
 
                 if update_entities:
-                    self.update_entities()
+                    with profiler.stage('update_entities'):
+                        self.update_entities()
                 update_entities = True
 
                 # check if encounters are available
 
-                self.draw()
-                encounter_ready, encounter_enemy_code = self.check_for_encounters()
+                self.draw(flush=False)
+                with profiler.stage('check_for_encounters'):
+                    encounter_ready, encounter_enemy_code = self.check_for_encounters()
                 
                 if key == 120: # x
                     self.tile_description_mode()    
@@ -296,14 +415,14 @@ class Game:
         window_height = max(len(messages) + 2, min_height)
         window_y = self.tile_window_height - window_height - 1
         window_x = 2
-        window = curses.newwin(window_height, window_width, window_y, window_x)
+        window = Render.newwin(window_height, window_width, window_y, window_x)
         draw_borders(window)
         if author:
             put(window, 0, 1, author)
         for i in range(len(messages)):
             put(window, 1 + i, 1, messages[i])
         continue_str = '<   #black-white V#normal    >'
-        cs_x = window_width // 2 - cct_len(continue_str) // 2
+        cs_x = window_width // 2 - Markup.cct_len(continue_str) // 2
         put(window, window_height - 1, cs_x, continue_str)
         while True:
             key = window.getch()
@@ -313,28 +432,26 @@ class Game:
 
     def check_for_encounters(self):
         encounter_ready = False
-        enemy_code = None
         min_d = -1
         min_enemy_code = None
-        for enemy_code in self.game_room.enemies_data:
-            enemy = self.game_room.enemies_data[enemy_code]
-            if self.can_see_enemy(enemy):
-            # if enemy.health > 0:
+        player_range = self.player.get_range()
+        for enemy_code in self.game_room.get_enemies_within(self.player_y, self.player_x, player_range):
+            if self.is_enemy_visible(enemy_code):
+                enemy = self.game_room.enemies_data[enemy_code]
                 d = distance(enemy.y, enemy.x, self.player_y, self.player_x)
-                player_range = self.player.get_range()
-                if d <= player_range:
-                    if min_d == -1 or d < min_d:
-                        min_d = d
-                        min_enemy_code = enemy_code
+                if min_d == -1 or d < min_d:
+                    min_d = d
+                    min_enemy_code = enemy_code
         if min_enemy_code != None:
             enemy = self.game_room.enemies_data[min_enemy_code]
             encounter_ready = True
             s = f'[ Press [c] to initiate combat with #red-black {enemy.name} #normal ]'
             y = self.tile_window_height - 2
-            x = self.tile_window_width // 2 - cct_len(s) // 2
+            x = self.tile_window_width // 2 - Markup.cct_len(s) // 2
             put(self.tile_window, y, x, s)
-            self.tile_window.refresh()
-        return (encounter_ready, enemy_code)    
+            self.tile_renderer.damage(y, x, Markup.cct_len(s))
+            Render.compositor.stage(self.tile_window)
+        return (encounter_ready, min_enemy_code)
 
     def update_entities(self):
         self.player.check_items()
@@ -346,11 +463,11 @@ class Game:
     def save_enemy_env_vars(self):
         for enemy_code in self.game_room.enemies_data:
             enemy = self.game_room.enemies_data[enemy_code]
-            f = f'enemies_{self.game_room.name}_{enemy_code}_'
-            self.set_env_var(f'{f}health', enemy.health)
-            self.set_env_var(f'{f}mana', enemy.mana)
-            self.set_env_var(f'{f}y', enemy.y)
-            self.set_env_var(f'{f}x', enemy.x)
+            y_slot, x_slot, health_slot, mana_slot = self.game_room.enemy_slots[enemy_code]
+            self.env_vars.set_slot(health_slot, enemy.health)
+            self.env_vars.set_slot(mana_slot, enemy.mana)
+            self.env_vars.set_slot(y_slot, enemy.y)
+            self.env_vars.set_slot(x_slot, enemy.x)
 
     def display_dialog(self, message: str, replies: list):
         borders_color_pair = 'cyan-black'
@@ -362,7 +479,7 @@ class Game:
         if '_say_name' in self.env_vars:
             name = self.get_env_var('_say_name')
 
-        w = curses.newwin(height - 1, width, height + 1, 2)
+        w = Render.newwin(height - 1, width, height + 1, 2)
         draw_borders(w, borders_color_pair)
         w.keypad(1)
         put(w, 0, 1, f'#green-black {name}')
@@ -410,37 +527,42 @@ class Game:
             if key == 120: # x
                 break
             self.tile_window.erase()
+            self.tile_renderer.clear()
+            # the cursor can only go where the player can see, same cells as draw_tiles draws
+            fov = self.get_player_fov()
             # North
-            if key in [56, 259] and cursor_map_y != 0 and distance(cursor_map_y - 1, cursor_map_x, self.player_y, self.player_x) < self.game_room.visible_range:
+            if key in [56, 259] and cursor_map_y != 0 and (cursor_map_y - 1 - self.player_y, cursor_map_x - self.player_x) in fov:
                 cursor_y -= 1
                 cursor_map_y -= 1
             # South
-            if key in [50, 258] and cursor_map_y != self.game_room.height - 1 and distance(cursor_map_y + 1, cursor_map_x, self.player_y, self.player_x) < self.game_room.visible_range:
+            if key in [50, 258] and cursor_map_y != self.game_room.height - 1 and (cursor_map_y + 1 - self.player_y, cursor_map_x - self.player_x) in fov:
                 cursor_y += 1
                 cursor_map_y += 1
             # West
-            if key in [52, 260] and cursor_map_x != 0 and distance(cursor_map_y, cursor_map_x - 1, self.player_y, self.player_x) < self.game_room.visible_range:
+            if key in [52, 260] and cursor_map_x != 0 and (cursor_map_y - self.player_y, cursor_map_x - 1 - self.player_x) in fov:
                 cursor_x -= 1
                 cursor_map_x -= 1
             # East
-            if key in [54, 261] and cursor_map_x != self.game_room.width - 1 and distance(cursor_map_y, cursor_map_x + 1, self.player_y, self.player_x) < self.game_room.visible_range:
+            if key in [54, 261] and cursor_map_x != self.game_room.width - 1 and (cursor_map_y - self.player_y, cursor_map_x + 1 - self.player_x) in fov:
                 cursor_x += 1
                 cursor_map_x += 1
             
+            self.tile_renderer.begin()
             self.draw_tiles(self.player_y, self.player_x, self.game_room.visible_range)
+            self.tile_renderer.flush()
             self.tile_window.addstr(self.mid_y, self.mid_x, '@')
             display_name = ''
             if cursor_y == self.mid_y and cursor_x == self.mid_x:
                 self.tile_window.addch(cursor_y, cursor_x, '@', curses.A_REVERSE)
                 display_name = self.player.name
             else:
-                tile = self.game_room.tiles[cursor_map_y][cursor_map_x]
+                tile = self.game_room.tile_at(cursor_map_y, cursor_map_x)
                 name = tile.name
                 char = tile.char
                 if name == 'hidden tile':
                     name = tile.actual_tile.name
                     char = tile.actual_tile.char
-                    if self.get_env_var(tile.signal) != True:
+                    if not tile.signal in self.game_room.signal_state:
                         name = 'wall'
                         char = '#'
                 if tile.char == ' ':
@@ -451,7 +573,7 @@ class Game:
                 if enemy.health > 0:
                     y = enemy.y + self.mid_y - self.player_y
                     x = enemy.x + self.mid_x - self.player_x
-                    if distance(self.player_y, self.player_x, enemy.y, enemy.x) < self.game_room.visible_range:
+                    if (enemy.y - self.player_y, enemy.x - self.player_x) in fov:
                         if y == cursor_y and x == cursor_x:
                             self.tile_window.addch(y, x, enemy.char, curses.A_REVERSE)
                             display_name = enemy.name
@@ -461,6 +583,7 @@ class Game:
                 self.tile_window.addstr(1, 1, f'[{display_name}]')
             draw_borders(self.tile_window)
         # clean-up
+        self.tile_renderer.invalidate()
         self.draw()
 
     def get_interactable_tiles(self, y: int, x: int):
@@ -468,29 +591,29 @@ class Game:
         x_lim = self.game_room.width
         result = []
         # North
-        if not y < 0 and self.game_room.tiles[y - 1][x].interactable:
-            result += [[self.game_room.tiles[y - 1][x], [56, 259]]]
+        if not y < 0 and self.game_room.is_interactable(y - 1, x):
+            result += [[self.game_room.tile_at(y - 1, x), [56, 259]]]
         # South
-        if not y >= y_lim and self.game_room.tiles[y + 1][x].interactable:
-            result += [[self.game_room.tiles[y + 1][x], [50, 258]]]
+        if not y >= y_lim and self.game_room.is_interactable(y + 1, x):
+            result += [[self.game_room.tile_at(y + 1, x), [50, 258]]]
         # West
-        if not x < 0 and self.game_room.tiles[y][x - 1].interactable:
-            result += [[self.game_room.tiles[y][x - 1], [52, 260]]]
+        if not x < 0 and self.game_room.is_interactable(y, x - 1):
+            result += [[self.game_room.tile_at(y, x - 1), [52, 260]]]
         # East
-        if not x >= x_lim and self.game_room.tiles[y][x + 1].interactable:
-            result += [[self.game_room.tiles[y][x + 1], [54, 261]]]
+        if not x >= x_lim and self.game_room.is_interactable(y, x + 1):
+            result += [[self.game_room.tile_at(y, x + 1), [54, 261]]]
         # NE
-        if not (y < 0 and not self.x >= x_lim) and self.game_room.tiles[y - 1][x + 1].interactable:
-            result += [[self.game_room.tiles[y - 1][x + 1], [117, 57]]]
+        if not (y < 0 and not self.x >= x_lim) and self.game_room.is_interactable(y - 1, x + 1):
+            result += [[self.game_room.tile_at(y - 1, x + 1), [117, 57]]]
         # NW
-        if not (y < 0 and x < 0) and self.game_room.tiles[y - 1][x - 1].interactable:
-            result += [[self.game_room.tiles[y - 1][x - 1], [121, 55]]]
+        if not (y < 0 and x < 0) and self.game_room.is_interactable(y - 1, x - 1):
+            result += [[self.game_room.tile_at(y - 1, x - 1), [121, 55]]]
         # SW
-        if not (y >= y_lim and x < 0) and self.game_room.tiles[y + 1][x - 1].interactable:
-            result += [[self.game_room.tiles[y + 1][x - 1], [98, 49]]]
+        if not (y >= y_lim and x < 0) and self.game_room.is_interactable(y + 1, x - 1):
+            result += [[self.game_room.tile_at(y + 1, x - 1), [98, 49]]]
         # SE
-        if not (y >= y_lim and x >= x_lim) and self.game_room.tiles[y + 1][x + 1].interactable:
-            result += [[self.game_room.tiles[y + 1][x + 1], [110, 51]]]
+        if not (y >= y_lim and x >= x_lim) and self.game_room.is_interactable(y + 1, x + 1):
+            result += [[self.game_room.tile_at(y + 1, x + 1), [110, 51]]]
         return result
 
     def interact_with_chest(self, chest_tile: Room.ChestTile):
@@ -525,7 +648,7 @@ class Game:
                 self.set_env_var(codes[i], True)
         # add items to inventory
         for i in results:
-            self.player.add_item(items[i])
+            self.player.add_item(items[i].copy())
 
         # clear the leftovers from the drop down box borders
         for i in range(self.parent.HEIGHT):
@@ -562,7 +685,7 @@ class Game:
 
         win_height = self.tile_window_height
         win_width = self.tile_window_width
-        inventory_window = curses.newwin(win_height, win_width, 0, 0)
+        inventory_window = Render.newwin(win_height, win_width, 0, 0)
         inventory_window.keypad(1)
 
         selected_tab = 0
@@ -584,7 +707,7 @@ class Game:
         # item description window
         d_window_height = self.parent.HEIGHT - self.player_info_window_height
         d_window_width = self.parent.WIDTH - self.tile_window_width - 1
-        description_window = curses.newwin(d_window_height, d_window_width, self.player_info_window_height, self.tile_window_width + 1)
+        description_window = Render.newwin(d_window_height, d_window_width, self.player_info_window_height, self.tile_window_width + 1)
 
         description_limit = d_window_height - 2
         description_page = 0        
@@ -695,11 +818,11 @@ class Game:
                     description_window.addch(1, d_window_width - 1, curses.ACS_UARROW)
                 if description_page != len(desc) - description_limit:
                     description_window.addch(d_window_height - 2, d_window_width - 1, curses.ACS_DARROW)
-            description_window.refresh()
+            Render.compositor.stage(description_window)
 
             # display player info
             self.draw_player_info()
-            self.player_info_window.refresh()
+            Render.compositor.show(self.player_info_window)
 
             # key handling
             key = inventory_window.getch()
@@ -798,12 +921,12 @@ class Game:
                         y = 3 + cursor
                         if y + height > self.tile_window_height:
                             y -= height
-                        x = 3 + cct_len(display_names[choice_id])
-                        options_window = curses.newwin(height, width, y, x)
+                        x = 3 + Markup.cct_len(display_names[choice_id])
+                        options_window = Render.newwin(height, width, y, x)
                         options_window.keypad(1)
                         draw_borders(options_window)
                         options_window.addstr(1, 1, 'Use', curses.A_REVERSE)
-                        options_window.refresh()
+                        Render.compositor.show(options_window)
                         while True:
                             key = options_window.getch()
                             if key == 27: # ESC
@@ -832,8 +955,8 @@ class Game:
                         y = 4 + cursor
                         if y + height > self.tile_window_height:
                             y -= height
-                        x = 4 + cct_len(display_names[choice_id])
-                        options_window = curses.newwin(height, width, y, x)
+                        x = 4 + Markup.cct_len(display_names[choice_id])
+                        options_window = Render.newwin(height, width, y, x)
                         options_window.keypad(1)
                         draw_borders(options_window)
                         option_choice_id = 0
@@ -901,11 +1024,11 @@ class Game:
                         if y + height > self.tile_window_height:
                             y -= height
                         x = 4 + len(display_names[choice_id])
-                        options_window = curses.newwin(height, width, y, x)
+                        options_window = Render.newwin(height, width, y, x)
                         options_window.keypad(1)
                         draw_borders(options_window)
                         options_window.addstr(1, 1, s, curses.A_REVERSE)
-                        options_window.refresh()
+                        Render.compositor.show(options_window)
                         while True:
                             key = options_window.getch()
                             if key == 27: # ESC
@@ -952,11 +1075,11 @@ class Game:
                         if y + height > self.tile_window_height:
                             y -= height
                         x = 5 + len(spell_display_names[spell_choice_id]) + 1
-                        options_window = curses.newwin(height, width, y, x)
+                        options_window = Render.newwin(height, width, y, x)
                         options_window.keypad(1)
                         draw_borders(options_window)
                         options_window.addstr(1, 1, s, curses.A_REVERSE)
-                        options_window.refresh()
+                        Render.compositor.show(options_window)
                         while True:
                             key = options_window.getch()
                             if key == 27: # ESC
@@ -970,7 +1093,7 @@ class Game:
                                     message_box(self.parent, 'Can\'t cast spell!', ['Ok'])
                                     break
                 self.draw_log_window()
-                self.log_window.refresh()
+                Render.compositor.stage(self.log_window)
             if key == 60: # <
                 if len(desc) > description_limit:
                     description_page -= 1
@@ -986,13 +1109,14 @@ class Game:
             inventory_window.erase()
   
         self.window.erase()
-        self.window.refresh()
+        Render.compositor.stage(self.window)
         self.draw()
 
     def get_prompt(self, message: str):
         message = '[#green-black {}#normal ]'.format(message)
-        put(self.tile_window, 1, self.mid_x - cct_len(message) // 2, message)
-        self.tile_window.refresh()
+        put(self.tile_window, 1, self.mid_x - Markup.cct_len(message) // 2, message)
+        self.tile_renderer.damage(1, self.mid_x - Markup.cct_len(message) // 2, Markup.cct_len(message))
+        Render.compositor.show(self.tile_window)
         key = self.window.getch()
         return key
     
@@ -1003,11 +1127,10 @@ class Game:
         b_l_window_y = self.parent.HEIGHT // 2 - b_l_window_height // 2
         b_l_window_x = self.parent.WIDTH // 2 - b_l_window_width // 2
 
-        big_log_window = curses.newwin(b_l_window_height, b_l_window_width, b_l_window_y, b_l_window_x)
+        big_log_window = Render.newwin(b_l_window_height, b_l_window_width, b_l_window_y, b_l_window_x)
         big_log_window.keypad(1)
 
-        splits = self.game_log.get_splits(b_l_window_width - 2)
-
+        line_width = b_l_window_width - 2
         limit = b_l_window_height - 2
         page = 0
 
@@ -1016,38 +1139,30 @@ class Game:
             big_log_window.erase()
             draw_borders(big_log_window)
             put(big_log_window, 0, 1, '#magenta-black Log')
-            first = 0
-            last = len(splits) - 1
-            if len(splits) > limit:
-                first = page
-                last = page + limit - 1
-            y = 1
-            for i in range(first, last + 1):
-                put(big_log_window, y, 1, splits[i])
-                y += 1
-            if len(splits) > limit:
-                if page != 0:
-                    big_log_window.addch(1, b_l_window_width - 1, curses.ACS_UARROW)
-                if page != len(splits) - limit:
-                    big_log_window.addch(b_l_window_height - 2, b_l_window_width - 1, curses.ACS_DARROW)
+            # only the page and the line after it get wrapped, the extra line tells if there is more below
+            lines = self.game_log.get_lines(line_width, page, limit + 1)
+            has_more = len(lines) > limit
+            lines = lines[:limit]
+            for i in range(len(lines)):
+                put(big_log_window, 1 + i, 1, lines[i])
+            if page != 0:
+                big_log_window.addch(1, b_l_window_width - 1, curses.ACS_UARROW)
+            if has_more:
+                big_log_window.addch(b_l_window_height - 2, b_l_window_width - 1, curses.ACS_DARROW)
 
             # key handling
             key = big_log_window.getch()
             if key == 27: # ESC
                 break
             if key == 259: # UP
-                if len(splits) > limit:
+                if page > 0:
                     page -= 1
-                    if page < 0:
-                        page = 0
             if key == 258: # DOWN
-                if len(splits) > limit:
+                if has_more:
                     page += 1
-                    if page > len(splits) - limit:
-                        page = len(splits) - limit
             
         self.window.erase()
-        self.window.refresh()
+        Render.compositor.stage(self.window)
         self.draw()
     
     def initiate_trade(self, vendor_name: str, gold_var: str, container_code: str):
@@ -1074,7 +1189,7 @@ class Game:
         state = trade.start()
         if not state:
             self.window.erase()
-            self.window.refresh()
+            Render.compositor.stage(self.window)
             self.draw()
             return
 
@@ -1118,21 +1233,25 @@ class Game:
             
         # clean-up
         self.window.erase()
-        self.window.refresh()
+        Render.compositor.stage(self.window)
         self.draw()
     
     def enemy_is_lit(self, enemy: Enemy):
-        for i in range(self.game_room.height):
-            for j in range(self.game_room.width):
-                r = 0
-                if isinstance(self.game_room.tiles[i][j], Room.TorchTile):
-                    r = self.game_room.tiles[i][j].visible_range
-                if isinstance(self.game_room.tiles[i][j], Room.HiddenTile) and self.get_env_var(self.game_room.tiles[i][j].signal) == True and isinstance(self.game_room.tiles[i][j].actual_tile, Room.TorchTile):
-                    # !!! BIG ISSUE !!! either rework hidden tiles, or make a work-around
-                    r = self.game_room.tiles[i][j].actual_tile.visible_range
-                if distance(i, j, enemy.y, enemy.x) < r:
-                    return True
-        return distance(self.player_y, self.player_x, enemy.y, enemy.x) < self.game_room.visible_range
+        if self.game_room.lightmap.is_lit(enemy.y, enemy.x):
+            return True
+        return (enemy.y - self.player_y, enemy.x - self.player_x) in self.get_player_fov()
+
+    def get_player_fov(self):
+        return FOV.get_fov(self.game_room, self.player_y, self.player_x, self.game_room.visible_range)
+
+    def is_enemy_visible(self, enemy_code: str):
+        key = (self.game_room, self.player_y, self.player_x, self.game_room.signal_state, self.game_room.enemy_index.version)
+        if key != self.enemy_visibility_key:
+            self.enemy_visibility_key = key
+            self.enemy_visibility = dict()
+        if not enemy_code in self.enemy_visibility:
+            self.enemy_visibility[enemy_code] = self.can_see_enemy(self.game_room.enemies_data[enemy_code])
+        return self.enemy_visibility[enemy_code]
 
     def can_see_enemy(self, enemy: Enemy):
         # enemy.health > 0 and sqrt((self.player_y - enemy.y) * (self.player_y - enemy.y) + (self.player_x - enemy.x) * (self.player_x - enemy.x)) < self.game_room.visible_range:
@@ -1151,6 +1270,7 @@ class Game:
             encounter = CombatEncounter(self.parent, enemy, self.player, d, self.config_file)
             self.game_log.add([f'#red-black {enemy.name} #normal attacks #green-black {self.player.name}!'])
         rewards = encounter.start()
+        self.game_room.update_enemy(encounter_enemy_code)
         
         if self.player.health == 0:
             answer = self.tile_message_box('PLAYER DEAD', ['Back to menu'])
@@ -1159,6 +1279,7 @@ class Game:
         if enemy.health == 0:
             # self.game_room.enemies_data.pop(encounter_enemy_code, None)
             self.save_enemy_env_vars()
+            self.triggers.enemy_died(encounter_enemy_code)
 
         # clear temporary statuses
         self.player.temporary_statuses = []
@@ -1176,7 +1297,7 @@ class Game:
 
         # clean-up
         self.window.erase()
-        self.window.refresh()
+        Render.compositor.stage(self.window)
         self.draw()
 
         if self.game_room.display_name != '':
@@ -1184,25 +1305,56 @@ class Game:
 
     # draw
 
-    def draw(self):
+    def draw(self, flush: bool=True):
         self.draw_player_info()
         self.draw_tile_window()
-        self.draw_mini_map(self.game_room.name)
-        self.draw_log_window()
+        with profiler.stage('draw_mini_map'):
+            self.draw_mini_map(self.game_room.name)
+        with profiler.stage('draw_log_window'):
+            self.draw_log_window()
         if self.game_room.display_name != '':
             self.draw_room_display_name(self.game_room.display_name)
 
-        self.tile_window.refresh()
-        self.player_info_window.refresh()
-        self.mini_map_window.refresh()
-        self.log_window.refresh()
+        Render.compositor.stage(self.tile_window, self.player_info_window, self.mini_map_window, self.log_window)
+        if profiler.enabled:
+            self.draw_profiler_overlay()
+        # the main loop flushes once per turn, everything else wants to see the result right away
+        if flush:
+            Render.compositor.flush()
+
+    def draw_profiler_overlay(self):
+        names = profiler.get_stage_names()
+        if len(names) == 0:
+            return
+        width = 46
+        if self.profiler_window == None or self.profiler_window.getmaxyx()[0] != len(names) + 3:
+            self.profiler_window = Render.newwin(len(names) + 3, width, 1, self.tile_window_width - width - 1)
+        win = self.profiler_window
+        win.erase()
+        draw_borders(win)
+        put(win, 0, 1, '#magenta-black Profiler')
+        win.addstr(1, 1, f'{"stage (ms)":<22}{"p50":>7}{"p95":>7}{"max":>7}')
+        for i in range(len(names)):
+            p50, p95, top = profiler.get_stats(names[i])
+            win.addstr(2 + i, 1, f'{names[i][:22]:<22}{p50:>7.2f}{p95:>7.2f}{top:>7.1f}')
+        Render.compositor.stage(win)
+
+    def panel_changed(self, panel: str, signature):
+        if panel in self.panel_signatures and self.panel_signatures[panel] == signature:
+            return False
+        self.panel_signatures[panel] = signature
+        return True
 
     def draw_log_window(self):
+        max_amount = self.log_window_height - 2
+        messages = self.game_log.get_last(self.log_window_width - 2, max_amount)
+        # the window is touched either way, so that a refresh repaints whatever was drawn over it
+        self.log_window.touchwin()
+        if not self.panel_changed('log', messages):
+            return
         self.log_window.erase()
         draw_borders(self.log_window)
         put(self.log_window, 0, 1, '#magenta-black Log')
-        max_amount = self.log_window_height - 2
-        messages = self.game_log.get_last(self.log_window_width - 2, max_amount)
         for i in range(len(messages)):
             put(self.log_window, 1 + i, 1, messages[i])
 
@@ -1214,59 +1366,78 @@ class Game:
         if self.player.health > self.player.get_max_health():
             self.player.health = self.player.get_max_health()
 
+        self.player_info_window.touchwin()
+        signature = (self.player.name, self.player.class_name, self.player.gold, self.player.get_armor(), self.player.health, self.player.get_max_health(), self.player.mana, self.player.get_max_mana(), self.player.STR, self.player.DEX, self.player.INT)
+        if not self.panel_changed('player info', signature):
+            return
         self.player_info_window.erase()
         draw_borders(self.player_info_window)
-        put(self.player_info_window, 0, 1, '#magenta-black Player info')
+        Markup.put(self.player_info_window, 0, 1, '#magenta-black Player info')
 
         fill = lambda value, max_length: ' ' * (max_length - len(str(value))) + str(value)
         y = 1
         x = 1
 
         # display name
-        put(self.player_info_window, y + 0, x, f'Name: #green-black {self.player.name}')
+        Markup.put(self.player_info_window, y + 0, x, f'Name: #green-black {self.player.name}')
         # display class
-        put(self.player_info_window, y + 1, x, f'Class: #green-black {self.player.class_name}')
+        Markup.put(self.player_info_window, y + 1, x, f'Class: #green-black {self.player.class_name}')
         # display gold
-        put(self.player_info_window, y + 2, x, f'Gold: #yellow-black {self.player.gold}')
+        Markup.put(self.player_info_window, y + 2, x, f'Gold: #yellow-black {self.player.gold}')
         # display armor rating
-        put(self.player_info_window, y + 3, x, f'Armor: #white-blue {self.player.get_armor()}')
+        Markup.put(self.player_info_window, y + 3, x, f'Armor: #white-blue {self.player.get_armor()}')
         # display health
         health_str = 'Health: #red-black {}#normal (#red-black {}#normal /#red-black {}#normal )'.format(calc_pretty_bars(self.player.health, self.player.get_max_health(), 10), fill(self.player.health, 3), fill(self.player.get_max_health(), 3))
-        put(self.player_info_window, y + 4, x, health_str)
+        Markup.put(self.player_info_window, y + 4, x, health_str)
         # display mana
         mana_str = '  Mana: #cyan-black {}#normal (#cyan-black {}#normal /#cyan-black {}#normal )'.format(calc_pretty_bars(self.player.mana, self.player.get_max_mana(), 10), fill(self.player.mana, 3), fill(self.player.get_max_mana(), 3))
-        put(self.player_info_window, y + 5, x, mana_str)
+        Markup.put(self.player_info_window, y + 5, x, mana_str)
         # display strength
-        put(self.player_info_window, y + 7, x, f'#black-red STR: #normal {fill(self.player.STR, 3)}')
+        Markup.put(self.player_info_window, y + 7, x, f'#black-red STR: #normal {fill(self.player.STR, 3)}')
         # display dexterity
-        put(self.player_info_window, y + 8, x, f'#black-green DEX: #normal {fill(self.player.DEX, 3)}')
+        Markup.put(self.player_info_window, y + 8, x, f'#black-green DEX: #normal {fill(self.player.DEX, 3)}')
         # display intelligence
-        put(self.player_info_window, y + 9, x, f'#black-cyan INT: #normal {fill(self.player.INT, 3)}')
+        Markup.put(self.player_info_window, y + 9, x, f'#black-cyan INT: #normal {fill(self.player.INT, 3)}')
 
     def draw_tile_window(self):
-        self.tile_window.erase()
-        draw_borders(self.tile_window)
-        put(self.tile_window, 0, 1, '#magenta-black Room display')
-        self.draw_tiles(self.player_y, self.player_x, self.game_room.visible_range)
-        self.draw_torches()
+        if self.tile_renderer.is_stale():
+            self.tile_window.erase()
+            self.tile_renderer.clear()
+            draw_borders(self.tile_window)
+            put(self.tile_window, 0, 1, '#magenta-black Room display')
+        self.tile_renderer.begin()
+        with profiler.stage('draw_tiles'):
+            self.draw_tiles(self.player_y, self.player_x, self.game_room.visible_range)
+        with profiler.stage('draw_torches'):
+            self.draw_torches()
+        self.tile_renderer.flush()
+        FOV.fov_cache.report()
         # last to display
         real_mid_y = self.mid_y + self.camera_dy
         real_mid_x = self.mid_x - self.camera_dx
         if real_mid_y > 0 and real_mid_y < self.tile_window_height - 1 and real_mid_x > 0 and real_mid_x < self.tile_window_width - 1:
             put(self.tile_window, real_mid_y, real_mid_x, '#green-black @')
-        if self.full_map != None:
-            self.draw_mini_map(self.game_room.name)
-        self.draw_enemies()
+            self.tile_renderer.damage(real_mid_y, real_mid_x)
+        with profiler.stage('draw_enemies'):
+            self.draw_enemies()
+        # the window is touched either way, so that a refresh repaints whatever was drawn over it
+        self.tile_window.touchwin()
 
     def draw_mini_map(self, room_name: str):
+        self.mini_map_window.touchwin()
+        hh = self.MINI_MAP_HEIGHT // 2
+        hw = self.MINI_MAP_WIDTH // 2
+        signature = None
+        if self.full_map != None:
+            signature = (room_name, self.full_map.version)
+        if not self.panel_changed('mini map', signature):
+            return
         self.mini_map_window.erase()
         draw_borders(self.mini_map_window)
         put(self.mini_map_window, 0, 1, '#magenta-black Minimap')
         if self.full_map == None:
             return
-        hh = self.MINI_MAP_HEIGHT // 2
-        hw = self.MINI_MAP_WIDTH // 2
-        mini_map_tiles = self.full_map.get_mini_tiles(room_name, self.env_vars, self.MINI_MAP_HEIGHT, self.MINI_MAP_WIDTH, hh, hw)
+        mini_map_tiles = self.full_map.get_mini_tiles(room_name, self.MINI_MAP_HEIGHT, self.MINI_MAP_WIDTH, hh, hw)
         for i in range(self.MINI_MAP_HEIGHT):
             for j in range(self.MINI_MAP_WIDTH):
                 if i == hh and j == hw:
@@ -1279,362 +1450,366 @@ class Game:
         w = len(display_name) + 2
         y = self.tile_window_height - 3 - 1
         x = self.tile_window_width - w -1
-        win = curses.newwin(h, w, y, x)
+        win = Render.newwin(h, w, y, x)
         win.addstr(1, 1, display_name)
         draw_borders(win)
 
     def draw_tiles(self, y: int, x: int, visible_range: int):
         mid_y = self.mid_y - self.player_y + y + self.camera_dy
         mid_x = self.mid_x - self.player_x + x - self.camera_dx
-        for i in range(max(1, mid_y - visible_range), min(self.tile_window_height - 1, mid_y + visible_range + 1)):
-            for j in range(max (1, mid_x - visible_range), min(self.tile_window_width - 1, mid_x + visible_range + 1)):
-                if distance(i, j, mid_y, mid_x) < visible_range:
-                    room_y = i + y - mid_y
-                    room_x = j + x - mid_x
-                    if room_y < 0 or room_x < 0 or room_y >= self.game_room.height or room_x >= self.game_room.width:
-                        self.tile_window.addch(i, j, '#')
-                    else:
-                        if self.game_room.tiles[room_y][room_x].char == '!':
-                            self.tile_window.addch(i, j, self.game_room.tiles[room_y][room_x].char, curses.A_BLINK)
-                        else:
-                            tile = self.game_room.tiles[room_y][room_x]
-                            if isinstance(tile, Room.HiddenTile):
-                                if self.get_env_var(tile.signal) == True:
-                                    self.game_room.tiles[room_y][room_x].solid = self.game_room.tiles[room_y][room_x].actual_tile.solid
-                                    self.game_room.tiles[room_y][room_x].interactable = self.game_room.tiles[room_y][room_x].actual_tile.interactable
-                                    self.tile_window.addch(i, j, self.game_room.tiles[room_y][room_x].actual_tile.char)
-                                else:
-                                    self.game_room.tiles[room_y][room_x].solid = True
-                                    self.game_room.tiles[room_y][room_x].interactable = False
-                                    self.tile_window.addch(i, j, self.game_room.tiles[room_y][room_x].char)
-                            else:
-                                self.tile_window.addch(i, j, self.game_room.tiles[room_y][room_x].char)
+        for dy, dx in FOV.get_fov(self.game_room, y, x, visible_range):
+            i = mid_y + dy
+            j = mid_x + dx
+            if i > 0 and j > 0 and i < self.tile_window_height - 1 and j < self.tile_window_width - 1:
+                self.draw_tile(i, j, y + dy, x + dx)
+
+    def draw_tile(self, i: int, j: int, room_y: int, room_x: int):
+        if room_y < 0 or room_x < 0 or room_y >= self.game_room.height or room_x >= self.game_room.width:
+            self.tile_renderer.addch(i, j, '#')
+        else:
+            tile = self.game_room.tile_at(room_y, room_x)
+            if tile.char == '!':
+                self.tile_renderer.addch(i, j, tile.char, curses.A_BLINK)
+            else:
+                if isinstance(tile, Room.HiddenTile) and tile.signal in self.game_room.signal_state:
+                    self.tile_renderer.addch(i, j, tile.actual_tile.char)
+                else:
+                    self.tile_renderer.addch(i, j, tile.char)
 
     def draw_torches(self):
-        for i in range(self.game_room.height):
-            for j in range(self.game_room.width):
-                if isinstance(self.game_room.tiles[i][j], Room.TorchTile):
-                    self.draw_tiles(i, j, self.game_room.tiles[i][j].visible_range)
-                if isinstance(self.game_room.tiles[i][j], Room.HiddenTile) and self.get_env_var(self.game_room.tiles[i][j].signal) == True and isinstance(self.game_room.tiles[i][j].actual_tile, Room.TorchTile):
-                    # !!! BIG ISSUE !!! either rework hidden tiles, or make a work-around
-                    self.draw_tiles(i, j, self.game_room.tiles[i][j].actual_tile.visible_range)
+        # offset from room to tile window coordinates
+        dy = self.mid_y - self.player_y + self.camera_dy
+        dx = self.mid_x - self.player_x - self.camera_dx
+        lightmap = self.game_room.lightmap
+        for i in range(1, self.tile_window_height - 1):
+            for room_x in lightmap.get_lit_cells(i - dy, 1 - dx, self.tile_window_width - 1 - dx):
+                self.draw_tile(i, room_x + dx, i - dy, room_x)
 
     def draw_enemies(self):
-        for enemy in list(self.game_room.enemies_data.values()):
-            if self.can_see_enemy(enemy):
+        # only enemies that land inside the tile window
+        top = self.player_y - self.mid_y
+        left = self.player_x - self.mid_x
+        for enemy_code in self.game_room.get_enemies_in_rect(top, left, top + self.tile_window_height - 1, left + self.tile_window_width - 1):
+            if self.is_enemy_visible(enemy_code):
+                enemy = self.game_room.enemies_data[enemy_code]
                 y = enemy.y + self.mid_y - self.player_y
                 x = enemy.x + self.mid_x - self.player_x
                 self.tile_window.addch(y, x, enemy.char)
+                self.tile_renderer.damage(y, x)
 
     # env vars
 
     def set_env_var(self, var: str, value):
+        # the current room and the map are subscribed to the vars they depend on
         self.env_vars[var] = value
 
     def get_env_var(self, var: str):
-        if not var in self.env_vars.keys():
-            return None
-        var = self.env_vars[var]
-        return var
+        return self.env_vars.get(var)
 
     def exec_line(self, line: str, scripts: dict):
-        if line[0] == '#':
+        # lines typed into the terminal are compiled on the fly
+        if not script_profiler.enabled:
+            return self.exec_instruction(Script.compile_line(line), scripts)
+        script_profiler.enter_script(self.game_room.name, '~')
+        script_profiler.enter_line(self.game_room.name, '~', 1, line)
+        try:
+            return self.exec_instruction(Script.compile_line(line), scripts)
+        finally:
+            script_profiler.exit_line()
+            script_profiler.exit_script()
+
+    def exec_instruction(self, instruction: Script.Instruction, scripts: dict):
+        if instruction.command != None:
+            self.last_command = instruction.command
+        if not instruction.opcode in Triggers.PASSIVE_OPCODES:
+            self.script_effects += 1
+        if instruction.opcode in BLOCKING_OPCODES and (script_profiler.enabled or profiler.enabled):
+            start = perf_counter()
+            try:
+                with profiler.wait('modal'):
+                    return self.script_ops[instruction.opcode](instruction.args, scripts)
+            finally:
+                if script_profiler.enabled:
+                    script_profiler.block(perf_counter() - start)
+        return self.script_ops[instruction.opcode](instruction.args, scripts)
+
+    # script opcodes, each returns True if the game should stop running the script
+
+    def op_comment(self, args: tuple, scripts: dict):
+        return False
+
+    def op_error(self, ex: Exception, scripts: dict):
+        # the line could not be compiled, fail the same way the interpreter would have
+        raise ex
+
+    def op_unknown(self, args: tuple, scripts: dict):
+        command = args[0]
+        raise Exception(f'ERR: command {command} not recognized')
+
+    def op_run(self, args: tuple, scripts: dict):
+        return self.exec_script(args[0], scripts)
+
+    def op_set(self, args: tuple, scripts: dict):
+        var, slot, value, operand = args
+        real_value = self.get_value(operand)
+        if real_value == None:
+            raise Exception(f'ERR: value {value} not recognized')
+        if var == 'player.health':
+            self.player.health = min(real_value, self.player.get_max_health())
             return False
-        words = line.split()
-        command = words[0]
-        self.last_command = command
-        if command == 'run':
-            script_name = words[1]
-            return self.exec_script(script_name, scripts)
-        if command == 'set':
-            var = words[1]
-            value = ' '.join(words[2:])
-            real_value = self.get_true_value(value)
-            if real_value == None:
-                raise Exception(f'ERR: value {value} not recognized')
-            if var == 'player.health':
-                self.player.health = min(real_value, self.player.get_max_health())                        
-                return False
-            if var == 'player.mana':
-                self.player.mana = min(real_value, self.player.get_max_mana())                        
-                return False
-            if var == 'player.gold':
-                self.player.gold = real_value
-                return False
-            self.set_env_var(var, real_value)
+        if var == 'player.mana':
+            self.player.mana = min(real_value, self.player.get_max_mana())
             return False
-        if command == 'unset':
-            var = words[1]
-            if var == 'all':
-                self.env_vars = dict()
-                return False
-            if not var in self.env_vars:
-                raise Exception(f'ERR: var {var} not recognized')
-            self.env_vars.pop(var, None)
+        if var == 'player.gold':
+            self.player.gold = real_value
             return False
-        if command == 'add':
-            var = words[1]
-            value = ' '.join(words[2:])
-            real_value = self.get_true_value(value)
-            if var == 'player.health':
-                self.player.add_health(real_value)
-                return False
-            if var == 'player.max_health':
-                self.player.max_health += real_value
-                return False
-            if var == 'player.mana':
-                self.player.add_mana(real_value)
-                return False
-            if var == 'player.max_mana':
-                self.player.max_mana += real_value
-                return False
-            if var == 'player.gold':
-                self.player.gold += real_value
-                return False
-            if var == 'player.inventory' or var == 'player.items':
-                sp = value.split(' ')
-                item = None
-                if sp[0].isdigit():
-                    amount = int(sp[0])
-                    item_name = self.get_true_value(' '.join(sp[1:]))
-                    item = Items.Item.get_base_items([item_name], self.config_file.get('Items path'))[0]
-                    item.amount = amount
-                else:
-                    item = Items.Item.get_base_items([real_value], self.config_file.get('Items path'))[0]
-                self.player.add_item(item)
-                return False
-            if var == 'player.spells':
-                self.player.learn_spells([real_value], self.config_file.get('Spells path'))
-                return False
-            if var in self.env_vars:
-                if isinstance(self.get_env_var(var), str):
-                    self.set_env_var(var, self.get_env_var(var) + str(real_value))
-                else:
-                    self.set_env_var(var, self.get_env_var(var) + real_value)
-                return False
-            raise Exception(f'ERR: variable {var} is not in env_vars')
-        if command == 'sub':
-            var = words[1]
-            value = words[2]
-            if not value.isdigit():
-                raise Exception(f'ERR: {value} is not a digit')
-            real_value = int(value)
-            if var == 'player.health':
-                self.player.add_health(-real_value)
-                return False
-            if var == 'player.max_health':
-                self.player.max_health -= real_value
-                return False
-            if var == 'player.mana':
-                self.player.add_mana(-real_value)
-                return False
-            if var == 'player.max_mana':
-                self.player.max_mana -= real_value
-                return False
-            if var == 'player.gold':
-                self.player.gold -= real_value
-                return False
-            if var in self.env_vars:
-                self.set_env_var(var, self.get_env_var(var) - real_value)
-                return False
-            raise Exception(f'ERR: variable {var} is not in env_vars')
-        if command == 'mb':
-            choices = words[1].split('|')
-            var = ' '.join(words[2:])
-            real_var = self.get_true_value(var)
-            if real_var == None:
-                raise Exception(f'ERR: {var} not recognized')  
-            answer = self.tile_message_box(str(real_var), choices)
-            self.set_env_var('_mb_result', answer)
-            self.draw_tile_window()
-            self.tile_window.refresh()
+        self.env_vars.set_slot(slot, real_value)
+        return False
+
+    def op_unset(self, args: tuple, scripts: dict):
+        var, slot = args
+        if var == 'all':
+            self.env_vars.clear()
             return False
-        if command == 'notify':
-            var = ' '.join(words[1:])
-            message = self.get_true_value(var)
-            author = self.get_env_var('_notify_name')
-            self.notify(message, author)
+        if not self.env_vars.has_slot(slot):
+            raise Exception(f'ERR: var {var} not recognized')
+        self.env_vars.unset_slot(slot)
+        return False
+
+    def op_add(self, args: tuple, scripts: dict):
+        var, slot, operand = args
+        real_value = self.get_value(operand)
+        if var == 'player.health':
+            self.player.add_health(real_value)
             return False
-        if command == 'say':
-            raw_replies = words[1].split('|')
-            replies = []
-            for r in raw_replies:
-                replies += [' '.join(r.split('_'))]
-            var = ' '.join(words[2:])
-            real_var = self.get_true_value(var)
-            if real_var == None:
-                raise Exception(f'ERR: {var} not recognized')
-            interlocutor_name = self.get_env_var('_say_name')
-            self.game_log.add(['#green-black {}#normal : #cyan-black \"{}\"'.format('???' if interlocutor_name == None else interlocutor_name, real_var)])
-            self.draw_log_window()
-            self.log_window.refresh()
-            reply = self.display_dialog(str(real_var), replies)
-            self.set_env_var('_reply', reply)
-            self.game_log.add([f'#green-black {self.player.name}#normal : #cyan-black \"{reply}\"'])
-            self.draw_tile_window()
-            self.tile_window.refresh()
-            self.draw_log_window()
-            self.log_window.refresh()
+        if var == 'player.max_health':
+            self.player.max_health += real_value
             return False
-        if command == 'log':
-            s = ' '.join(words[1:])
-            message = self.get_true_value(s)
-            self.game_log.add([message])
-            self.draw_log_window()
-            self.log_window.refresh()
+        if var == 'player.mana':
+            self.player.add_mana(real_value)
             return False
-        if command == 'move':
-            entity_name = words[1]
-            move_y = int(words[2])
-            move_x = int(words[3])
-            if entity_name == 'player':
-                self.player_y += move_y
-                self.player_x += move_x
-            if entity_name == 'camera':
-                self.camera_dy += move_y
-                self.camera_dx += move_x
-            self.tile_window.erase()
-            self.draw_tile_window()
-            self.tile_window.refresh()
+        if var == 'player.max_mana':
+            self.player.max_mana += real_value
             return False
-        if command == 'kill':
-            enemy_code = words[1]
-            enemy = self.game_room.enemies_data[enemy_code]
-            enemy.health = 0
+        if var == 'player.gold':
+            self.player.gold += real_value
             return False
-        if command == 'revive':
-            enemy_code = words[1]
-            enemy = self.game_room.enemies_data[enemy_code]
-            enemy.health = enemy.get_max_health()
+        if var == 'player.spells':
+            self.player.learn_spells([real_value], self.config_file.get('Spells path'))
             return False
-        if command == 'sleep':
-            self.draw_tile_window()
-            self.tile_window.refresh()
-            amount = int(words[1])
-            curses.napms(amount)
+        if self.env_vars.has_slot(slot):
+            current = self.env_vars.get_slot(slot)
+            if isinstance(current, str):
+                self.env_vars.set_slot(slot, current + str(real_value))
+            else:
+                self.env_vars.set_slot(slot, current + real_value)
             return False
-        if command == 'clear':
-            var = words[1]
-            if words[1] == 'player.inventory' or words[1] == 'player.items':
-                self.player.items = []
-                self.player.countable_items = []
-                self.player.equipment['HEAD'] = None
-                self.player.equipment['BODY'] = None
-                self.player.equipment['LEGS'] = None
-                self.player.equipment['ARM1'] = None
-                self.player.equipment['ARM2'] = None
-                return False
-            if words[1] == 'player.spells':
-                self.player.spells = []
-                return False
-            raise Exception(f'ERR: unknown var {var}')
-        if command == 'if':
-            words.pop(0)
-            reverse = False
-            do_if = False
-            if words[0] == 'not':
-                reverse = True
-                words.pop(0)
-            if words[0] == 'set':
-                var = words[1]
-                do_if = var in self.env_vars.keys()
-            # conditionals
-            if words[1] in ['==', '>', '<', '>=', '<=']:
-                var1 = words[0]
-                var2 = ' '.join(words[2:words.index('then')])
-                real_var1 = self.get_true_value(var1)
-                real_var2 = self.get_true_value(var2)
-                if words[1] == '==':
-                    do_if = real_var1 == real_var2
-                if words[1] == '!=':
-                    do_if = real_var1 != real_var2
-                if words[1] == '>':
-                    do_if = real_var1 > real_var2
-                if words[1] == '<':
-                    do_if = real_var1 > real_var2
-                if words[1] == '>=':
-                    do_if = real_var1 >= real_var2
-                if words[1] == '<=':
-                    do_if = real_var1 >= real_var2
-            if words[1] == 'in':
-                item_name = self.get_env_var(words[0])
-                container_code = words[2]
-                if container_code == 'player.inventory' or container_code == 'player.items':
-                    do_if = False
-                    for item in self.player.items:
-                        if item.name == item_name:
-                            do_if = True
-                            break
-                    for item in self.player.countable_items:
-                        if item.name == item_name:
-                            do_if = True
-                            break
-                else:
-                    items = self.game_room.container_info[container_code]
-                    do_if = False
-                    for item in items:
-                        if item.name == item_name:
-                            code = items[item]
-                            code_value = self.get_env_var(code)
-                            if code_value == None: 
-                                do_if = True
-                            elif code_value != True and code_value != 0:
-                                do_if = True
-            if reverse != do_if:
-                return self.exec_line(' '.join(words[words.index('then') + 1:]), scripts)
+        raise Exception(f'ERR: variable {var} is not in env_vars')
+
+    def op_add_item(self, args: tuple, scripts: dict):
+        amount, operand = args
+        item = Items.Item.get_base_items([self.get_value(operand)], self.config_file.get('Items path'))[0]
+        if amount != None:
+            item.amount = amount
+        self.player.add_item(item)
+        return False
+
+    def op_sub(self, args: tuple, scripts: dict):
+        var, slot, real_value = args
+        if var == 'player.health':
+            self.player.add_health(-real_value)
             return False
-        if command == 'fight':
-            enemy_code = words[1]
-            self.initiate_encounter_with(enemy_code, False)
-            return self.player.health == 0
-        if command == 'trade':
-            gold_var = words[1]
-            container_code = words[2]
-            vendor_name = '???'
-            if '_vendor_name' in self.env_vars:
-                vendor_name = self.get_env_var('_vendor_name')
-            self.initiate_trade(vendor_name, gold_var, container_code)
+        if var == 'player.max_health':
+            self.player.max_health -= real_value
             return False
-        if command == 'draw':
-            self.draw()
+        if var == 'player.mana':
+            self.player.add_mana(-real_value)
             return False
-        if command == 'stop':
-            return True
-        if command == 'return':
-            var = ' '.join(words[1:])
-            real_var = self.get_true_value(var)
-            self.set_env_var('_return_value', real_var)
+        if var == 'player.max_mana':
+            self.player.max_mana -= real_value
             return False
-        raise Exception(f'ERR: command {command} not recognized')
+        if var == 'player.gold':
+            self.player.gold -= real_value
+            return False
+        if self.env_vars.has_slot(slot):
+            self.env_vars.set_slot(slot, self.env_vars.get_slot(slot) - real_value)
+            return False
+        raise Exception(f'ERR: variable {var} is not in env_vars')
+
+    def op_mb(self, args: tuple, scripts: dict):
+        choices, var, operand = args
+        real_var = self.get_value(operand)
+        if real_var == None:
+            raise Exception(f'ERR: {var} not recognized')
+        answer = self.tile_message_box(str(real_var), choices)
+        self.set_env_var('_mb_result', answer)
+        self.draw_tile_window()
+        Render.compositor.stage(self.tile_window)
+        return False
+
+    def op_notify(self, args: tuple, scripts: dict):
+        message = self.get_value(args[0])
+        author = self.get_env_var('_notify_name')
+        self.notify(message, author)
+        return False
+
+    def op_say(self, args: tuple, scripts: dict):
+        replies, var, operand = args
+        real_var = self.get_value(operand)
+        if real_var == None:
+            raise Exception(f'ERR: {var} not recognized')
+        interlocutor_name = self.get_env_var('_say_name')
+        self.game_log.add(['#green-black {}#normal : #cyan-black \"{}\"'.format('???' if interlocutor_name == None else interlocutor_name, real_var)])
+        self.draw_log_window()
+        Render.compositor.show(self.log_window)
+        reply = self.display_dialog(str(real_var), replies)
+        self.set_env_var('_reply', reply)
+        self.game_log.add([f'#green-black {self.player.name}#normal : #cyan-black \"{reply}\"'])
+        self.draw_tile_window()
+        self.draw_log_window()
+        Render.compositor.stage(self.tile_window, self.log_window)
+        return False
 
-    def get_true_value(self, s: str):
-        if s.lstrip('-').isdigit():
-            return int(s)
-        if s[0] == '"' and s[len(s) - 1] == '"':
-            return s[1:len(s) - 1]
-        if s.lower() == 'true':
-            return True
-        if s.lower() == 'false':
+    def op_log(self, args: tuple, scripts: dict):
+        message = self.get_value(args[0])
+        self.game_log.add([message])
+        self.draw_log_window()
+        Render.compositor.stage(self.log_window)
+        return False
+
+    def op_move(self, args: tuple, scripts: dict):
+        entity_name, move_y, move_x = args
+        if entity_name == 'player':
+            self.player_y += move_y
+            self.player_x += move_x
+        if entity_name == 'camera':
+            self.camera_dy += move_y
+            self.camera_dx += move_x
+        self.tile_window.erase()
+        self.tile_renderer.invalidate()
+        self.draw_tile_window()
+        Render.compositor.stage(self.tile_window)
+        return False
+
+    def op_kill(self, args: tuple, scripts: dict):
+        enemy_code = args[0]
+        enemy = self.game_room.enemies_data[enemy_code]
+        was_alive = enemy.health != 0
+        enemy.health = 0
+        self.game_room.update_enemy(enemy_code)
+        if was_alive:
+            self.triggers.enemy_died(enemy_code)
+        return False
+
+    def op_revive(self, args: tuple, scripts: dict):
+        enemy_code = args[0]
+        enemy = self.game_room.enemies_data[enemy_code]
+        enemy.health = enemy.get_max_health()
+        self.game_room.update_enemy(enemy_code)
+        return False
+
+    def op_sleep(self, args: tuple, scripts: dict):
+        self.draw_tile_window()
+        Render.compositor.show(self.tile_window)
+        amount = int(args[0][0])
+        Render.napms(amount)
+        return False
+
+    def op_clear(self, args: tuple, scripts: dict):
+        var = args[0]
+        if var == 'player.inventory' or var == 'player.items':
+            self.player.items = []
+            self.player.countable_items = []
+            self.player.equipment['HEAD'] = None
+            self.player.equipment['BODY'] = None
+            self.player.equipment['LEGS'] = None
+            self.player.equipment['ARM1'] = None
+            self.player.equipment['ARM2'] = None
+            return False
+        if var == 'player.spells':
+            self.player.spells = []
             return False
-        if s == 'player.health':
-            return self.player.health
-        if s == 'player.max_health':
-            return self.player.get_max_health()
-        if s == 'player.mana':
-            return self.player.mana
-        if s == 'player.max_mana':
-            return self.player.get_max_mana()
-        if s == 'player.name':
-            return self.player.name
-        if s == 'player.y':
-            return self.player_y
-        if s == 'player.x':
-            return self.player_x
-        if s == 'player.gold':
-            return self.player.gold
-        if s in self.env_vars:
-            return self.get_env_var(s)
-        ss = s.split('.')
+        raise Exception(f'ERR: unknown var {var}')
+
+    def op_if(self, args: tuple, scripts: dict):
+        reverse, condition, branch = args
+        do_if = False
+        kind = condition[0]
+        if kind == 'set':
+            do_if = self.env_vars.has_slot(condition[1])
+        if kind == 'compare':
+            comparison, operand1, operand2 = condition[1:]
+            real_var1 = self.get_value(operand1)
+            real_var2 = self.get_value(operand2)
+            if comparison == '==':
+                do_if = real_var1 == real_var2
+            # < and <= have always been checked as > and >=, existing scripts are written against that
+            if comparison == '>' or comparison == '<':
+                do_if = real_var1 > real_var2
+            if comparison == '>=' or comparison == '<=':
+                do_if = real_var1 >= real_var2
+        if kind == 'in':
+            item_name = self.env_vars.get_slot(condition[1])
+            container_code = condition[2]
+            if container_code == 'player.inventory' or container_code == 'player.items':
+                do_if = False
+                for item in self.player.items:
+                    if item.name == item_name:
+                        do_if = True
+                        break
+                for item in self.player.countable_items:
+                    if item.name == item_name:
+                        do_if = True
+                        break
+            else:
+                items = self.game_room.container_info[container_code]
+                do_if = False
+                for item in items:
+                    if item.name == item_name:
+                        code = items[item]
+                        code_value = self.get_env_var(code)
+                        if code_value == None: 
+                            do_if = True
+                        elif code_value != True and code_value != 0:
+                            do_if = True
+        if reverse != do_if:
+            return self.exec_instruction(branch, scripts)
+        return False
+
+    def op_fight(self, args: tuple, scripts: dict):
+        self.initiate_encounter_with(args[0], False)
+        return self.player.health == 0
+
+    def op_trade(self, args: tuple, scripts: dict):
+        gold_var, container_code = args
+        vendor_name = '???'
+        if '_vendor_name' in self.env_vars:
+            vendor_name = self.get_env_var('_vendor_name')
+        self.initiate_trade(vendor_name, gold_var, container_code)
+        return False
+
+    def op_draw(self, args: tuple, scripts: dict):
+        self.draw()
+        return False
+
+    def op_stop(self, args: tuple, scripts: dict):
+        return True
+
+    def op_return(self, args: tuple, scripts: dict):
+        real_var = self.get_value(args[0])
+        self.set_env_var('_return_value', real_var)
+        return False
+
+    def get_value(self, operand: tuple):
+        kind, value = operand
+        if kind == Script.CONST:
+            return value
+        if kind == Script.INVALID:
+            raise value
+        result = self.env_vars.read(value)
+        if not result is EnvVars.UNSET:
+            return result
+        ss = EnvVars.get_name(value).split('.')
         if ss[0] in self.game_room.container_info:
             if ss[1] == 'length':
                 items = self.game_room.container_info[ss[0]]
@@ -1646,32 +1821,86 @@ class Game:
                 return result
         return None
 
+    def run_triggers(self):
+        # triggered scripts can trigger more scripts, but they have to settle down at some point
+        runs = 0
+        while self.triggers.has_pending():
+            runs += 1
+            if runs > Triggers.MAX_RUNS:
+                # a problem in the room's scripts, the game goes on without the scripts that were still queued
+                message = f'triggers in room {self.game_room.name} keep triggering each other, dropped: {", ".join(self.triggers.pending)}'
+                # without -d there is no log file and the message would be printed over the screen
+                if logging.getLogger().hasHandlers():
+                    logging.error(message)
+                self.game_log.add([f'#red-black ERR: {message}'])
+                self.triggers.clear_pending()
+                return
+            self.exec_script(self.triggers.pop_pending(), self.game_room.compiled_scripts)
+            if not self.game_running:
+                return
+
+    def wait_for_key(self):
+        # timers fire while the game waits for input
+        while self.triggers.has_timers():
+            self.window.timeout(self.triggers.get_timeout())
+            key = self.window.getch()
+            self.window.timeout(-1)
+            if key != -1:
+                return key
+            self.triggers.queue_timers()
+            self.run_triggers()
+            if not self.game_running:
+                return -1
+            self.draw(flush=False)
+            Render.compositor.flush()
+        return self.window.getch()
+
     def exec_script(self, name: str, scripts: dict):
+        # scripts are the compiled scripts of the room
+        if script_profiler.enabled:
+            return self.exec_script_profiled(name, scripts)
         script = scripts[name]
-        for script_line in script:
-            if script_line == '':
-                continue
-            quit = self.exec_line(script_line, scripts)
+        for instruction in script:
+            quit = self.exec_instruction(instruction, scripts)
             if self.last_command == 'return':
                 self.last_command = ''
                 return False
             if quit:
                 return True
             
+    def exec_script_profiled(self, name: str, scripts: dict):
+        # same as exec_script, but every line is timed
+        room_name = self.game_room.name
+        script = scripts[name]
+        script_profiler.enter_script(room_name, name)
+        try:
+            for instruction in script:
+                script_profiler.enter_line(room_name, name, instruction.line, instruction.source)
+                try:
+                    quit = self.exec_instruction(instruction, scripts)
+                finally:
+                    script_profiler.exit_line()
+                if self.last_command == 'return':
+                    self.last_command = ''
+                    return False
+                if quit:
+                    return True
+        finally:
+            script_profiler.exit_script()
+
     def get_terminal_command(self):
         self.window.addstr(self.tile_window_height, 1, '> ')
-        self.window.refresh()
-        w = curses.newwin(1, self.tile_window_width - 3, self.tile_window_height, 3)
-        curses.curs_set(1)
+        Render.compositor.show(self.window)
+        w = Render.newwin(1, self.tile_window_width - 3, self.tile_window_height, 3)
+        Render.curs_set(1)
         w.keypad(1)
         box = textpad.Textbox(w)
         box.edit(self._terminal_command_validator)
         result = box.gather()
-        curses.curs_set(0)
+        Render.curs_set(0)
         w.erase()
-        w.refresh()
         self.window.addstr(self.tile_window_height, 1, '  ')
-        self.window.refresh()
+        Render.compositor.stage(w, self.window)
         return result
 
     def _terminal_command_validator(self, ch: str):
@@ -1695,6 +1924,8 @@ class GameWindow(Window):
         if config_file.has('Starting room'):
             self.starting_room = config_file.get('Starting room')
         self.game_speed = 200
+        if config_file.has('Content pack path'):
+            Content.registry.open_pack(config_file.get('Content pack path'))
 
         self.create_folders()
 
@@ -1839,10 +2070,10 @@ class GameWindow(Window):
         character_class = character_class.lower()
         player = Player()
         player.name = character_name
-        data = json.loads(open('assets/class_schemas.json').read())
+        data = Content.registry.get_data(self.config_file.get('Class schemas path'))
         if not character_class in data:
             raise Exception(f'ERR: Class {character_class} not found in assets')
-        player.load_class(data[character_class], 'assets/items.json')
+        player.load_class(data[character_class], self.config_file.get('Items path'))
         already_exists = SaveFile.save_file_exists(self.config_file.get('Saves path'), player.name)
         if already_exists and message_box(self, f'File with name {player.name} already exists, override?', ['No', 'Yes']) == 'No':
             return
@@ -0,0 +1,134 @@
+from collections import deque
+from time import perf_counter
+
+# upper bounds of the histogram buckets, in milliseconds
+BUCKETS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+class NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def stop(self):
+        pass
+
+NO_STAGE = NoStage()
+
+class Stage:
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+        # time of the waits inside the stage, left out of its own time
+        self.excluded = 0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        self.profiler.running += [self]
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+        return False
+
+    def stop(self):
+        self.profiler.running.remove(self)
+        self.profiler.record(self.name, perf_counter() - self.start - self.excluded)
+
+class Wait(Stage):
+    def stop(self):
+        elapsed = perf_counter() - self.start
+        self.profiler.running.remove(self)
+        self.profiler.record(self.name, elapsed)
+        # waits inside this one already took their time out of the stages around it
+        for stage in self.profiler.running:
+            stage.excluded += elapsed - self.excluded
+
+class Profiler:
+    def __init__(self, window_size: int=120):
+        self.enabled = False
+        self.window_size = window_size
+        # rolling samples for the overlay, in milliseconds
+        self.samples = dict()
+        # all samples ever recorded, per bucket
+        self.histograms = dict()
+        self.totals = dict()
+        self.maximums = dict()
+        # per-frame amounts that are not timings, name -> [frames, total, max]
+        self.counters = dict()
+        # stages that have been entered and not stopped yet
+        self.running = []
+
+    def enable(self):
+        self.enabled = True
+
+    def stage(self, name: str):
+        # use as: with profiler.stage('draw_tiles'): ...
+        if not self.enabled:
+            return NO_STAGE
+        return Stage(self, name)
+
+    def wait(self, name: str):
+        # for modal screens and other waits for the player inside a stage:
+        # with profiler.wait('modal'): ...
+        if not self.enabled:
+            return NO_STAGE
+        return Wait(self, name)
+
+    def record(self, name: str, seconds: float):
+        ms = seconds * 1000
+        if not name in self.samples:
+            self.samples[name] = deque(maxlen=self.window_size)
+            self.histograms[name] = [0] * (len(BUCKETS) + 1)
+            self.totals[name] = 0
+            self.maximums[name] = 0
+        self.samples[name].append(ms)
+        bucket = 0
+        while bucket < len(BUCKETS) and ms > BUCKETS[bucket]:
+            bucket += 1
+        self.histograms[name][bucket] += 1
+        self.totals[name] += ms
+        self.maximums[name] = max(self.maximums[name], ms)
+
+    def count(self, name: str, value: int):
+        if not self.enabled:
+            return
+        if not name in self.counters:
+            self.counters[name] = [0, 0, 0]
+        counter = self.counters[name]
+        counter[0] += 1
+        counter[1] += value
+        counter[2] = max(counter[2], value)
+
+    def get_stage_names(self):
+        return list(self.samples.keys())
+
+    def get_stats(self, name: str):
+        # p50, p95 and max of the rolling window
+        samples = sorted(self.samples[name])
+        p50 = samples[len(samples) // 2]
+        p95 = samples[min(len(samples) - 1, len(samples) * 95 // 100)]
+        return (p50, p95, samples[-1])
+
+    def dump(self, path: str):
+        lines = []
+        for name in self.histograms:
+            histogram = self.histograms[name]
+            count = sum(histogram)
+            lines += [f'{name}: {count} samples, mean {self.totals[name] / count:.3f}ms, max {self.maximums[name]:.3f}ms']
+            highest = max(histogram)
+            for i in range(len(histogram)):
+                if histogram[i] == 0:
+                    continue
+                label = f'<={BUCKETS[i]}ms' if i < len(BUCKETS) else f'>{BUCKETS[-1]}ms'
+                bar = '#' * max(1, histogram[i] * 40 // highest)
+                lines += [f'    {label:>10} {histogram[i]:>8} {bar}']
+            lines += ['']
+        for name in self.counters:
+            frames, total, maximum = self.counters[name]
+            lines += [f'{name}: {frames} frames, mean {total / frames:.1f}, max {maximum}']
+        open(path, 'w').write('\n'.join(lines))
+
+profiler = Profiler()
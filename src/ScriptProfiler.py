@@ -0,0 +1,101 @@
+from time import perf_counter
+
+# opcodes that wait for the player or the clock, their time is reported apart from the time spent running scripts
+BLOCKING_OPCODES = ['mb', 'say', 'sleep', 'notify', 'fight', 'trade']
+
+class Entry:
+    def __init__(self, source: str):
+        self.source = source
+        self.count = 0
+        # in seconds, total includes nested scripts, self does not
+        self.total = 0
+        self.self_time = 0
+        self.blocked = 0
+        # blocked time of the entry's own instructions, not of the scripts it runs
+        self.self_blocked = 0
+        # deepest run nesting the entry was reached at, 1 is a script started by the game
+        self.max_depth = 0
+
+class Frame:
+    def __init__(self, key: tuple, depth: int):
+        self.key = key
+        self.depth = depth
+        self.start = perf_counter()
+        self.children = 0
+        self.blocked = 0
+        self.self_blocked = 0
+
+class ScriptProfiler:
+    def __init__(self):
+        self.enabled = False
+        # (room, script, None) for scripts and (room, script, line number) for lines -> Entry
+        self.entries = dict()
+        self.stack = []
+        self.depth = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def enter_script(self, room: str, script: str):
+        self.depth += 1
+        self.push((room, script, None), None)
+
+    def exit_script(self):
+        self.pop()
+        self.depth -= 1
+
+    def enter_line(self, room: str, script: str, line: int, source: str):
+        self.push((room, script, line), source)
+
+    def exit_line(self):
+        self.pop()
+
+    def block(self, seconds: float):
+        # blocked time counts for every line and script that is waiting on it
+        if len(self.stack) > 0:
+            self.stack[-1].blocked += seconds
+            self.stack[-1].self_blocked += seconds
+
+    def push(self, key: tuple, source: str):
+        if not key in self.entries:
+            self.entries[key] = Entry(source)
+        self.stack += [Frame(key, self.depth)]
+
+    def pop(self):
+        frame = self.stack.pop()
+        elapsed = perf_counter() - frame.start
+        entry = self.entries[frame.key]
+        entry.count += 1
+        entry.total += elapsed
+        entry.self_time += elapsed - frame.children
+        entry.blocked += frame.blocked
+        entry.self_blocked += frame.self_blocked
+        entry.max_depth = max(entry.max_depth, frame.depth)
+        if len(self.stack) > 0:
+            self.stack[-1].children += elapsed
+            self.stack[-1].blocked += frame.blocked
+
+    def get_report(self, amount: int=50):
+        # scripts and lines sorted by self time, without the time spent waiting for the player
+        scripts = [key for key in self.entries if key[2] == None]
+        lines = [key for key in self.entries if key[2] != None]
+        sort_key = lambda key: self.entries[key].self_time - self.entries[key].self_blocked
+        scripts.sort(key=sort_key, reverse=True)
+        lines.sort(key=sort_key, reverse=True)
+        header = f'{"count":>8} {"total ms":>10} {"self ms":>10} {"blocked ms":>10} {"depth":>5}  '
+        result = ['scripts:', header + 'room/script']
+        for key in scripts[:amount]:
+            result += [self.format_entry(key) + f'{key[0]}/{key[1]}']
+        result += ['', 'lines:', header + 'room/script:line']
+        for key in lines[:amount]:
+            result += [self.format_entry(key) + f'{key[0]}/{key[1]}:{key[2]}  {self.entries[key].source}']
+        return result
+
+    def format_entry(self, key: tuple):
+        entry = self.entries[key]
+        return f'{entry.count:>8} {entry.total * 1000:>10.3f} {entry.self_time * 1000:>10.3f} {entry.blocked * 1000:>10.3f} {entry.max_depth:>5}  '
+
+    def dump(self, path: str):
+        open(path, 'w').write('\n'.join(self.get_report()))
+
+script_profiler = ScriptProfiler()
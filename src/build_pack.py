@@ -0,0 +1,37 @@
+import json
+import sys
+from os import listdir
+from os.path import splitext
+from Configuraion import ConfigFile
+from gamelib.ContentPack import ContentPack
+from gamelib.Room import CompiledRoom
+
+# usage: python3 src/build_pack.py [config path] [pack path]
+config_path = 'settings.config'
+pack_path = 'content.pack'
+if len(sys.argv) > 1:
+    config_path = sys.argv[1]
+if len(sys.argv) > 2:
+    pack_path = sys.argv[2]
+
+config_file = ConfigFile(config_path)
+sections = dict()
+for key in ['Items path', 'Spells path', 'Class schemas path', 'Enemy schemas path', 'Recipes path']:
+    path = config_file.get(key)
+    data = json.loads(open(path, 'r').read())
+    if isinstance(data, list):
+        sections[path] = ['list', {str(i): data[i] for i in range(len(data))}]
+    else:
+        sections[path] = ['dict', data]
+
+rooms_path = config_file.get('Rooms path')
+rooms = dict()
+for file in sorted(listdir(rooms_path)):
+    name, ext = splitext(file)
+    if ext != '.room':
+        continue
+    rooms[name] = CompiledRoom.from_text(name, open(f'{rooms_path}/{file}', 'r').read()).json()
+sections[rooms_path] = ['rooms', rooms]
+
+ContentPack.build(pack_path, sections)
+print(f'Packed {len(sections) - 1} catalogs and {len(rooms)} rooms into {pack_path}')
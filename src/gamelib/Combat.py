@@ -6,10 +6,12 @@ from Configuraion import ConfigFile
 import gamelib.Items as Items
 import gamelib.Entities as Entities
 import gamelib.Spells as Spells
+import gamelib.Render as Render
+import gamelib.Markup as Markup
 
 from gamelib.Items import Ammo, MeleeWeapon, RangedWeapon, UsableItem
 from ncursesui.Elements import Window
-from ncursesui.Utility import cct_len, put, draw_borders, drop_down_box, calc_pretty_bars, str_smart_split, SINGLE_ELEMENT, show_controls_window
+from ncursesui.Utility import put, draw_borders, drop_down_box, calc_pretty_bars, str_smart_split, SINGLE_ELEMENT, show_controls_window
 
 class Status:
     def __init__(self, name, duration):
@@ -142,7 +144,7 @@ class AttackPlayerAction(Action):
         damage = self.user.damage
         damage += random.randint(0, self.user.damage_mod)
         dealt_damage = self.other.take_damage(damage)
-        curses.flash()
+        Render.flash()
         result = self.user.attack_format.format(dealt_damage, self.other.name)
         return [result]
 
@@ -278,13 +280,13 @@ class CombatEncounter:
             self.enemy_window.addstr(i, 1, ' ' * (self.box_width - 3))
         
         # display health
-        put(self.enemy_window, y_first, 1, f'Health: #red-black {calc_pretty_bars(enemy.health, enemy.get_max_health(), self.box_width - 17)}')
+        Markup.put(self.enemy_window, y_first, 1, f'Health: #red-black {calc_pretty_bars(enemy.health, enemy.get_max_health(), self.box_width - 17)}')
         self.enemy_window.addstr(y_first, self.box_width - 7, f'(   )')
-        put(self.enemy_window, y_first, self.box_width - 6, f'#red-black {enemy.health}')
+        Markup.put(self.enemy_window, y_first, self.box_width - 6, f'#red-black {enemy.health}')
         # display mana
-        put(self.enemy_window, y_first + 1, 1, f'  Mana: #cyan-black {calc_pretty_bars(enemy.mana, enemy.get_max_mana(), self.box_width - 17)}')
+        Markup.put(self.enemy_window, y_first + 1, 1, f'  Mana: #cyan-black {calc_pretty_bars(enemy.mana, enemy.get_max_mana(), self.box_width - 17)}')
         self.enemy_window.addstr(y_first + 1, self.box_width - 7, f'(   )')
-        put(self.enemy_window, y_first + 1, self.box_width - 6, f'#cyan-black {enemy.mana}')
+        Markup.put(self.enemy_window, y_first + 1, self.box_width - 6, f'#cyan-black {enemy.mana}')
 
         # display statuses
         self.enemy_window.addstr(y_first + 2, 1, 'Statuses:')
@@ -307,13 +309,13 @@ class CombatEncounter:
             self.player_window.addstr(i, 1, ' ' * (self.box_width - 3))
 
         # display health
-        put(self.player_window, y_first, 1, f'Health: #red-black {calc_pretty_bars(player.health, player.get_max_health(), self.box_width - 16)}')
+        Markup.put(self.player_window, y_first, 1, f'Health: #red-black {calc_pretty_bars(player.health, player.get_max_health(), self.box_width - 16)}')
         self.player_window.addstr(y_first, self.box_width - 6, f'(   )')
-        put(self.player_window, y_first, self.box_width - 5, f'#red-black {player.health}')
+        Markup.put(self.player_window, y_first, self.box_width - 5, f'#red-black {player.health}')
         # display mana
-        put(self.player_window, y_first + 1, 1, f'  Mana: #cyan-black {calc_pretty_bars(player.mana, player.get_max_mana(), self.box_width - 16)}')
+        Markup.put(self.player_window, y_first + 1, 1, f'  Mana: #cyan-black {calc_pretty_bars(player.mana, player.get_max_mana(), self.box_width - 16)}')
         self.player_window.addstr(y_first + 1, self.box_width - 6, f'(   )')
-        put(self.player_window, y_first + 1, self.box_width - 5, f'#cyan-black {player.mana}')
+        Markup.put(self.player_window, y_first + 1, self.box_width - 5, f'#cyan-black {player.mana}')
 
         # display statuses
         statuses = player.get_status_display_names()
@@ -344,18 +346,14 @@ class CombatEncounter:
 
         draw_borders(self.window)
         draw_borders(self.player_window)
-        put(self.player_window, 0, 1, f'#green-black {self.get_player().name}')
+        Markup.put(self.player_window, 0, 1, f'#green-black {self.get_player().name}')
         self.draw_option_boxes()
         draw_borders(self.enemy_window)
-        put(self.enemy_window, 0, 1, f'#red-black {self.get_enemy().name}')
+        Markup.put(self.enemy_window, 0, 1, f'#red-black {self.get_enemy().name}')
         draw_borders(self.player_actions_window)
-        put(self.player_actions_window, 0, 1, '#magenta-black Player options')
+        Markup.put(self.player_actions_window, 0, 1, '#magenta-black Player options')
 
-        self.window.refresh()
-        self.player_window.refresh()
-        self.enemy_window.refresh()
-        self.player_actions_window.refresh()
-        self.combat_log_window.refresh()
+        Render.compositor.show(self.window, self.player_window, self.enemy_window, self.player_actions_window, self.combat_log_window)
 
     def draw_combat_log(self):
         self.combat_log_window.erase()
@@ -377,12 +375,12 @@ class CombatEncounter:
                 self.combat_log_window.addch(self.combat_log_window_height - 2, self.combat_log_window_width - 1, curses.ACS_DARROW)
 
     def start(self):
-        self.window = curses.newwin(self.HEIGHT, self.WIDTH, 0, 0)
+        self.window = Render.newwin(self.HEIGHT, self.WIDTH, 0, 0)
         self.window.keypad(1)
-        self.player_actions_window = curses.newwin(self.middle_height - self.combat_log_window_height, self.middle_width, 1, self.box_width + 1)
-        self.combat_log_window = curses.newwin(self.combat_log_window_height, self.combat_log_window_width, self.HEIGHT - self.combat_log_window_height - 1, self.box_width + 1)
-        self.player_window = curses.newwin(self.box_height, self.box_width, 1, 1)
-        self.enemy_window = curses.newwin(self.box_height, self.box_width - 1, 1, self.WIDTH - self.box_width)
+        self.player_actions_window = Render.newwin(self.middle_height - self.combat_log_window_height, self.middle_width, 1, self.box_width + 1)
+        self.combat_log_window = Render.newwin(self.combat_log_window_height, self.combat_log_window_width, self.HEIGHT - self.combat_log_window_height - 1, self.box_width + 1)
+        self.player_window = Render.newwin(self.box_height, self.box_width, 1, 1)
+        self.enemy_window = Render.newwin(self.box_height, self.box_width - 1, 1, self.WIDTH - self.box_width)
         self.update_player_options()
         self.draw()
         return self.main_loop()
@@ -405,7 +403,7 @@ class CombatEncounter:
                     if self.cl_page < 0:
                         self.cl_page = 0
                     self.draw_combat_log()
-                    self.combat_log_window.refresh()
+                    Render.compositor.show(self.combat_log_window)
                     continue
             if key == 62: # >
                 if len(self.combat_log) > self.cl_limit:
@@ -413,7 +411,7 @@ class CombatEncounter:
                     if self.cl_page > len(self.combat_log) - self.cl_limit:
                         self.cl_page = len(self.combat_log) - self.cl_limit
                     self.draw_combat_log()
-                    self.combat_log_window.refresh()
+                    Render.compositor.show(self.combat_log_window)
                     continue
             if key == 259: # UP
                 self.action_id -= 1
@@ -506,7 +504,7 @@ class CombatEncounter:
         display_names = [f'{w.name} (range: {w.range})' for w in weapons]
         w_height = len(display_names) + 2
         w_width = max([len(d) for d in display_names]) + 2
-        w_choice_window = curses.newwin(w_height, w_width, 2, 12 + self.box_width)
+        w_choice_window = Render.newwin(w_height, w_width, 2, 12 + self.box_width)
         w_choice_window.keypad(1)
         draw_borders(w_choice_window)
         choice_i = 0
@@ -544,8 +542,8 @@ class CombatEncounter:
             return None
         display_names = [item.get_cct_display_text() for item in ammo_items]
         a_w_height = len(ammo_items) + 2
-        a_w_width = max([cct_len(d) for d in display_names]) + 2
-        a_window = curses.newwin(a_w_height, a_w_width, 5, 12 + w_width)
+        a_w_width = max([Markup.cct_len(d) for d in display_names]) + 2
+        a_window = Render.newwin(a_w_height, a_w_width, 5, 12 + w_width)
         a_window.keypad(1)
         draw_borders(a_window)
         choice_i = 0
@@ -670,7 +668,7 @@ class CombatEncounter:
             display_names += [item.get_cct_display_text()]
 
         r_w_height = max(self.HEIGHT // 3, len(display_names))
-        r_w_width = max(self.WIDTH // 3, max([cct_len(n) for n in display_names])) + 5
+        r_w_width = max(self.WIDTH // 3, max([Markup.cct_len(n) for n in display_names])) + 5
         
         limit = r_w_height - 3
         page = 0
@@ -678,11 +676,11 @@ class CombatEncounter:
         r_w_y = self.HEIGHT // 2 - r_w_height // 2
         r_w_x = self.WIDTH // 2 - r_w_width // 2 + 1
 
-        rewards_window = curses.newwin(r_w_height, r_w_width, r_w_y, r_w_x)
+        rewards_window = Render.newwin(r_w_height, r_w_width, r_w_y, r_w_x)
         rewards_window.keypad(1)
         draw_borders(rewards_window)
         put(rewards_window, 0, 1, '#magenta-black End of combat')
-        rewards_window.refresh()
+        Render.compositor.stage(rewards_window)
         rewards_window.addstr(1, 1, 'Rewards:')
 
         while True:
@@ -0,0 +1,83 @@
+import json
+from os import stat
+from threading import Lock
+from gamelib.ContentPack import ContentPack
+
+class Catalog:
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.data = None
+        # when set, entries are decoded from the pack one by one instead of parsing the whole file
+        self.pack = None
+        self.prototypes = dict()
+
+class ContentRegistry:
+    def __init__(self):
+        self.catalogs = dict()
+        self.pack = None
+        # the room prefetcher thread loads content too
+        self.lock = Lock()
+
+    def open_pack(self, path: str):
+        with self.lock:
+            if self.pack != None:
+                self.pack.close()
+            self.pack = ContentPack(path)
+            self.catalogs = dict()
+
+    def get_pack(self):
+        with self.lock:
+            return self._get_pack()
+
+    def get_catalog(self, path: str):
+        with self.lock:
+            pack = self._get_pack()
+            if pack != None and not pack.has_section(path):
+                pack = None
+            if pack != None:
+                mtime = pack.mtime
+            else:
+                mtime = stat(path).st_mtime_ns
+            if not path in self.catalogs:
+                self.catalogs[path] = Catalog(path)
+            catalog = self.catalogs[path]
+            if catalog.mtime != mtime or catalog.pack != pack:
+                catalog.data = None
+                if pack == None:
+                    catalog.data = json.loads(open(path, 'r').read())
+                catalog.pack = pack
+                catalog.prototypes = dict()
+                catalog.mtime = mtime
+            return catalog
+
+    def get_data(self, path: str):
+        # the returned data is shared, never modify it
+        catalog = self.get_catalog(path)
+        with self.lock:
+            if catalog.data == None:
+                catalog.data = catalog.pack.get_section(path)
+            return catalog.data
+
+    def get_prototype(self, path: str, name: str, factory):
+        # the returned prototype is shared, hand out copies of it
+        catalog = self.get_catalog(path)
+        with self.lock:
+            if not name in catalog.prototypes:
+                if catalog.data != None:
+                    js = catalog.data[name]
+                else:
+                    js = catalog.pack.get_entry(path, name)
+                catalog.prototypes[name] = factory(js)
+            return catalog.prototypes[name]
+
+    def _get_pack(self):
+        if self.pack == None:
+            return None
+        if stat(self.pack.path).st_mtime_ns != self.pack.mtime:
+            # pack was rebuilt, the old mapping still points at the replaced file
+            # and is left open for whoever still reads from it
+            self.pack = ContentPack(self.pack.path)
+        return self.pack
+
+registry = ContentRegistry()
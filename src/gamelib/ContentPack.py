@@ -0,0 +1,80 @@
+import json
+import mmap
+import struct
+from os import fstat, replace
+
+# pack layout:
+#   magic | version | header size | header | entry blobs
+# the header maps every section (asset path) to its kind and to the [offset, length] of each entry,
+# offsets start at the first blob, so only the entries that are actually used ever get decoded
+MAGIC = b'FCGPACK\0'
+VERSION = 1
+PREFIX = struct.Struct('<II')
+
+class ContentPack:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mtime = fstat(self.file.fileno()).st_mtime_ns
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise Exception(f'ERR: {path} is not a content pack')
+        version, header_size = PREFIX.unpack_from(self.data, len(MAGIC))
+        if version != VERSION:
+            self.close()
+            raise Exception(f'ERR: content pack {path} has version {version}, expected {VERSION}')
+        start = len(MAGIC) + PREFIX.size
+        self.sections = json.loads(self.data[start:start + header_size])
+        self.blobs_start = start + header_size
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def has_section(self, section: str):
+        return section in self.sections
+
+    def has_entry(self, section: str, name: str):
+        return section in self.sections and name in self.sections[section]['entries']
+
+    def get_names(self, section: str):
+        return list(self.sections[section]['entries'].keys())
+
+    def get_entry(self, section: str, name: str):
+        offset, length = self.sections[section]['entries'][name]
+        offset += self.blobs_start
+        return json.loads(self.data[offset:offset + length])
+
+    def get_section(self, section: str):
+        names = self.get_names(section)
+        if self.sections[section]['kind'] == 'list':
+            return [self.get_entry(section, name) for name in names]
+        result = dict()
+        for name in names:
+            result[name] = self.get_entry(section, name)
+        return result
+
+    # static methods
+
+    def build(path: str, sections: dict):
+        # sections: {section: [kind, {name: json data}]}
+        header = dict()
+        blobs = []
+        offset = 0
+        for section, [kind, entries] in sections.items():
+            header[section] = {'kind': kind, 'entries': dict()}
+            for name, js in entries.items():
+                blob = json.dumps(js).encode('utf-8')
+                header[section]['entries'][name] = [offset, len(blob)]
+                blobs += [blob]
+                offset += len(blob)
+        raw_header = json.dumps(header).encode('utf-8')
+        tmp_file = f'{path}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(MAGIC)
+            f.write(PREFIX.pack(VERSION, len(raw_header)))
+            f.write(raw_header)
+            for blob in blobs:
+                f.write(blob)
+        replace(tmp_file, path)
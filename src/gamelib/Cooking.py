@@ -1,8 +1,10 @@
 import curses
-import json
 import collections
+from copy import deepcopy
 
 import gamelib.Entities as Entities
+import gamelib.Content as Content
+import gamelib.Render as Render
 
 from Configuraion import ConfigFile
 from ncursesui.Elements import Window
@@ -14,7 +16,7 @@ compare_lists = lambda x, y: collections.Counter(x) == collections.Counter(y)
 class Recipe:
     def from_json(js):
         recipe = Recipe(None, None)
-        recipe.__dict__ = js
+        recipe.__dict__ = deepcopy(js)
         return recipe
 
     def get_result(pot: list[tuple[str, int]], recipes: list['Recipe']):
@@ -56,7 +58,7 @@ class Cooking:
         self.items_path = config_file.get('Items path')
 
     def add_recipes(self, path: str):
-        raw_recipes = json.loads(open(path, 'r').read())
+        raw_recipes = Content.registry.get_data(path)
         for recipe in raw_recipes:
             self.recipes += [Recipe.from_json(recipe)]
 
@@ -126,12 +128,12 @@ class CursesCooking:
     def start(self):
         piw_height = self.parent.HEIGHT * 3 // 4
         piw_width = self.parent.WIDTH
-        self.player_ingredients_window = curses.newwin(piw_height, piw_width, 0, 0)
+        self.player_ingredients_window = Render.newwin(piw_height, piw_width, 0, 0)
         self.player_ingredients_window.keypad(1)
         
         pw_height = self.parent.HEIGHT - piw_height
         pw_width = piw_width
-        self.pot_window = curses.newwin(pw_height, pw_width, piw_height, 0)
+        self.pot_window = Render.newwin(pw_height, pw_width, piw_height, 0)
         self.pot_window.keypad(1)
         self.main_loop()
 
@@ -161,8 +163,7 @@ class CursesCooking:
 
         self.player_ingredients_window.erase()
         self.pot_window.erase()
-        self.player_ingredients_window.refresh()
-        self.pot_window.refresh()
+        Render.compositor.show(self.player_ingredients_window, self.pot_window)
 
     def reset_amounts(self):
         self.cooking.reset_amounts()
@@ -186,8 +187,7 @@ class CursesCooking:
         self.draw_player_ingredients_window()
         self.draw_pot_window()
 
-        self.player_ingredients_window.refresh()
-        self.pot_window.refresh()
+        Render.compositor.show(self.player_ingredients_window, self.pot_window)
 
     def draw_player_ingredients_window(self):
         self.player_ingredients_window.erase()
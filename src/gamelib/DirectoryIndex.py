@@ -0,0 +1,52 @@
+from os import listdir, stat
+from os.path import isfile, join, splitext
+
+_indexes = dict()
+
+class DirectoryIndex:
+    def __init__(self, path: str, extension: str):
+        self.path = path
+        self.extension = extension
+        self.mtime = None
+        self.files = dict()
+
+    def get(path: str, extension: str):
+        key = (path, extension)
+        if not key in _indexes:
+            _indexes[key] = DirectoryIndex(path, extension)
+        return _indexes[key]
+
+    def refresh(self):
+        mtime = stat(self.path).st_mtime_ns
+        if mtime == self.mtime:
+            return
+        files = dict()
+        for f in listdir(self.path):
+            name, extension = splitext(f)
+            if extension == self.extension and isfile(join(self.path, f)):
+                files[name] = f'{self.path}/{f}'
+        # replace the whole dict at once, the index is also read from the room prefetcher thread
+        self.files = files
+        self.mtime = mtime
+
+    def invalidate(self):
+        # for changes made by the game itself, the directory mtime can be too coarse to notice them
+        self.mtime = None
+
+    def has(self, name: str):
+        self.refresh()
+        return name in self.files
+
+    def get_path(self, name: str):
+        self.refresh()
+        if not name in self.files:
+            return None
+        return self.files[name]
+
+    def get_names(self):
+        self.refresh()
+        return list(self.files.keys())
+
+    def get_file_names(self):
+        self.refresh()
+        return [f'{name}{self.extension}' for name in self.files]
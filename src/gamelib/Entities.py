@@ -1,9 +1,10 @@
-import json
 import random
+from copy import deepcopy
 from Configuraion import ConfigFile
 from gamelib.Items import *
 import gamelib.Spells as Spells
 import gamelib.Combat as Combat
+import gamelib.Content as Content
 
 class Entity:
     def __init__(self):
@@ -130,15 +131,24 @@ class Enemy(Entity):
 
     def from_enemy_name(name, config_file: ConfigFile):
         enemy_schemas_path = config_file.get('Enemy schemas path')
+        return Content.registry.get_prototype(enemy_schemas_path, name, Enemy.from_json).copy()
+
+    def from_json(js: dict):
         result = Enemy()
-        data = json.loads(open(enemy_schemas_path, 'r').read())[name]
-        result.__dict__ = data
-        snames = data['statuses']
+        # js can be the catalog's own data
+        result.__dict__ = deepcopy(js)
         result.statuses = []
-        for name in snames:
+        for name in js['statuses']:
             result.statuses += [Combat.Status(name, -1)]
         return result
 
+    def copy(self):
+        # nested values are copied too, prototypes must not change through their copies
+        result = Enemy()
+        result.__dict__ = deepcopy(self.__dict__)
+        result.statuses = [Combat.Status(status.name, status.duration) for status in self.statuses]
+        return result
+
     def get_rewards(self, config_file: ConfigFile):
         result = {}
 
@@ -0,0 +1,137 @@
+from threading import Lock
+
+# var names are interned into slots once per process, so that compiled scripts and rooms can keep the numbers
+_slots = dict()
+_names = []
+_lock = Lock()
+
+# value of a slot that is not set, None is a valid value
+UNSET = object()
+
+def intern(name: str):
+    # rooms are compiled on the prefetcher thread as well
+    with _lock:
+        if not name in _slots:
+            _slots[name] = len(_names)
+            _names.append(name)
+        return _slots[name]
+
+def get_name(slot: int):
+    return _names[slot]
+
+class EnvVars:
+    def __init__(self, data: dict=dict()):
+        # slot -> value
+        self.values = []
+        self.count = 0
+        # slot -> getter, for pseudo-variables like player.health that live outside of the store
+        self.bound = dict()
+        # slot -> callbacks, called with the slot and the new value (None once unset) whenever the value changes
+        self.subscribers = dict()
+        for name in data:
+            self[name] = data[name]
+
+    def bind(self, name: str, getter):
+        # bound names are only visible to read, they are not set, listed or saved
+        self.bound[intern(name)] = getter
+
+    def subscribe(self, slot: int, callback):
+        if not slot in self.subscribers:
+            self.subscribers[slot] = []
+        self.subscribers[slot] += [callback]
+
+    def unsubscribe(self, slot: int, callback):
+        if not slot in self.subscribers or not callback in self.subscribers[slot]:
+            return
+        self.subscribers[slot].remove(callback)
+        if len(self.subscribers[slot]) == 0:
+            self.subscribers.pop(slot)
+
+    def _notify(self, slot: int, value):
+        if not slot in self.subscribers:
+            return
+        for callback in list(self.subscribers[slot]):
+            callback(slot, value)
+
+    # slot access
+
+    def has_slot(self, slot: int):
+        return slot < len(self.values) and self.values[slot] is not UNSET
+
+    def get_slot(self, slot: int, default=None):
+        if slot < len(self.values) and self.values[slot] is not UNSET:
+            return self.values[slot]
+        return default
+
+    def set_slot(self, slot: int, value):
+        if slot >= len(self.values):
+            self.values += [UNSET] * (slot + 1 - len(self.values))
+        old = self.values[slot]
+        if old is UNSET:
+            self.count += 1
+        self.values[slot] = value
+        if old is UNSET or type(old) != type(value) or old != value:
+            self._notify(slot, value)
+
+    def unset_slot(self, slot: int):
+        if self.has_slot(slot):
+            self.values[slot] = UNSET
+            self.count -= 1
+            self._notify(slot, None)
+
+    def read(self, slot: int):
+        # value of a script operand: bound getter first, then the stored value, UNSET if there is neither
+        if slot in self.bound:
+            return self.bound[slot]()
+        if slot < len(self.values):
+            return self.values[slot]
+        return UNSET
+
+    # dict access, for code that works with var names
+
+    def __contains__(self, name: str):
+        return name in _slots and self.has_slot(_slots[name])
+
+    def __getitem__(self, name: str):
+        if not name in self:
+            raise KeyError(name)
+        return self.values[_slots[name]]
+
+    def __setitem__(self, name: str, value):
+        self.set_slot(intern(name), value)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, name: str, default=None):
+        if not name in self:
+            return default
+        return self.values[_slots[name]]
+
+    def pop(self, name: str, default=None):
+        if not name in self:
+            return default
+        slot = _slots[name]
+        result = self.values[slot]
+        self.unset_slot(slot)
+        return result
+
+    def keys(self):
+        return [_names[slot] for slot in range(len(self.values)) if self.values[slot] is not UNSET]
+
+    def items(self):
+        return [(_names[slot], self.values[slot]) for slot in range(len(self.values)) if self.values[slot] is not UNSET]
+
+    def clear(self):
+        old = self.values
+        self.values = []
+        self.count = 0
+        for slot in list(self.subscribers):
+            if slot < len(old) and old[slot] is not UNSET:
+                self._notify(slot, None)
+
+    def json(self):
+        return dict(self.items())
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from threading import Lock
+from Profiler import profiler
+
+# transforms from octant coordinates to room offsets, one column per octant
+OCTANTS = [
+    [1, 0, 0, -1, -1, 0, 0, 1],
+    [0, 1, -1, 0, 0, -1, 1, 0],
+    [0, 1, 1, 0, 0, -1, -1, 0],
+    [1, 0, 0, 1, -1, 0, 0, -1]
+]
+
+def compute_fov(room, y: int, x: int, radius: int):
+    # recursive shadowcasting over the solid cells of the room,
+    # returns the offsets from y, x of every cell in sight that is closer than radius
+    result = set()
+    if radius <= 0:
+        return frozenset(result)
+    result.add((0, 0))
+    for octant in range(8):
+        _cast_light(room, y, x, 1, 1.0, 0.0, radius, OCTANTS[0][octant], OCTANTS[1][octant], OCTANTS[2][octant], OCTANTS[3][octant], result)
+    return frozenset(result)
+
+def _is_blocking(room, y: int, x: int):
+    # everything outside of the room blocks sight, but can still be seen
+    if y < 0 or x < 0 or y >= room.height or x >= room.width:
+        return True
+    return room.is_solid(y, x)
+
+def _cast_light(room, cy: int, cx: int, row: int, start: float, end: float, radius: int, xx: int, xy: int, yx: int, yy: int, result: set):
+    if start < end:
+        return
+    rr = radius * radius
+    new_start = start
+    for j in range(row, radius):
+        dx = -j - 1
+        dy = -j
+        blocked = False
+        while dx <= 0:
+            dx += 1
+            oy = dx * yx + dy * yy
+            ox = dx * xx + dy * xy
+            l_slope = (dx - 0.5) / (dy + 0.5)
+            r_slope = (dx + 0.5) / (dy - 0.5)
+            if start < r_slope:
+                continue
+            if end > l_slope:
+                break
+            if dx * dx + dy * dy < rr:
+                result.add((oy, ox))
+            if blocked:
+                if _is_blocking(room, cy + oy, cx + ox):
+                    new_start = r_slope
+                    continue
+                blocked = False
+                start = new_start
+            elif _is_blocking(room, cy + oy, cx + ox) and j < radius - 1:
+                blocked = True
+                _cast_light(room, cy, cx, j + 1, start, l_slope, radius, xx, xy, yx, yy, result)
+                new_start = r_slope
+        if blocked:
+            break
+
+class FOVCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # since the last report
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, room, y: int, x: int, radius: int):
+        # rooms with the same name share their layout, hidden tiles change what blocks sight,
+        # so the revealed signals are part of the key
+        key = (room.name, y, x, radius, room.signal_state)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        result = compute_fov(room, y, x, radius)
+        with self.lock:
+            self.entries[key] = result
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return result
+
+    def forget(self, room_name: str):
+        # the room's layout is gone or stale, like when the room pool drops it
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == room_name]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def report(self):
+        # once per frame, hands the hits and misses since the last report to the profiler
+        with self.lock:
+            hits, misses = self.hits, self.misses
+            self.hits = 0
+            self.misses = 0
+        profiler.count('fov cache hits', hits)
+        profiler.count('fov cache misses', misses)
+
+fov_cache = FOVCache(512)
+
+def get_fov(room, y: int, x: int, radius: int):
+    return fov_cache.get(room, y, x, radius)
@@ -0,0 +1,17 @@
+# offset tables are built once per radius and shared
+_disc_offsets = dict()
+
+def in_radius(dy: int, dx: int, radius: int):
+    # same as distance < radius, without the square root
+    return dy * dy + dx * dx < radius * radius
+
+def disc_offsets(radius: int):
+    # offsets of all the cells closer than radius to the center, row by row
+    if not radius in _disc_offsets:
+        result = []
+        for dy in range(1 - radius, radius):
+            for dx in range(1 - radius, radius):
+                if in_radius(dy, dx, radius):
+                    result += [(dy, dx)]
+        _disc_offsets[radius] = tuple(result)
+    return _disc_offsets[radius]
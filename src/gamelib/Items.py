@@ -1,7 +1,8 @@
-import json
+from copy import deepcopy
 from Configuraion import ConfigFile
 from ncursesui.Utility import str_smart_split, pos_neg_int
 import gamelib.Entities as Entities
+import gamelib.Content as Content
 
 class Item:
     def get_template_from_type(t):
@@ -26,10 +27,9 @@ class Item:
         return Item()
 
     def get_base_items(names: list[str], path: str):
-        data = json.loads(open(path).read())
         result = []
         for item_name in names:
-            result += [Item.from_json(data[item_name])]
+            result += [Content.registry.get_prototype(path, item_name, Item.from_json).copy()]
         return result
 
     def arr_to_json(items: list['Item']):
@@ -52,7 +52,7 @@ class Item:
         t = js['itype']
         result = Item.get_template_from_type(t)
         for key in js:
-            result.__dict__[key] = js[key]
+            result.__dict__[key] = deepcopy(js[key])
         # result.__dict__ = js
         return result
 
@@ -94,8 +94,9 @@ class Item:
         return self.name
 
     def copy(self):
+        # nested values are copied too, prototypes must not change through their copies
         result = Item.get_template_from_type(self.itype)
-        result.__dict__ = dict(self.__dict__)
+        result.__dict__ = deepcopy(self.__dict__)
         return result
 
 class GoldPouch(Item):
@@ -0,0 +1,51 @@
+from array import array
+from gamelib.Geometry import disc_offsets
+
+class Lightmap:
+    def __init__(self, height: int, width: int, margin: int):
+        # the map reaches margin cells past the room edges, torches light up the void around the room too
+        self.height = height
+        self.width = width
+        self.margin = margin
+        self.map_height = height + 2 * margin
+        self.map_width = width + 2 * margin
+        # lit holds the number of lights reaching each cell, row_counts the number of lit cells in each row
+        self.lit = array('H', [0]) * (self.map_height * self.map_width)
+        self.row_counts = array('I', [0]) * self.map_height
+
+    def add_light(self, y: int, x: int, radius: int):
+        self._apply(y, x, radius, 1)
+
+    def remove_light(self, y: int, x: int, radius: int):
+        self._apply(y, x, radius, -1)
+
+    def is_lit(self, y: int, x: int):
+        i = y + self.margin
+        j = x + self.margin
+        if i < 0 or j < 0 or i >= self.map_height or j >= self.map_width:
+            return False
+        return self.lit[i * self.map_width + j] > 0
+
+    def get_lit_cells(self, y: int, x_from: int, x_to: int):
+        # x coordinates of the lit cells in row y, from x_from up to (not including) x_to
+        i = y + self.margin
+        if i < 0 or i >= self.map_height or self.row_counts[i] == 0:
+            return []
+        base = i * self.map_width + self.margin
+        start = max(x_from, -self.margin)
+        end = min(x_to, self.width + self.margin)
+        lit = self.lit
+        return [x for x in range(start, end) if lit[base + x]]
+
+    def _apply(self, y: int, x: int, radius: int, delta: int):
+        # a cell is lit when it is closer than radius to the light
+        for di, dj in disc_offsets(radius):
+            i = y + di + self.margin
+            j = x + dj + self.margin
+            if i < 0 or j < 0 or i >= self.map_height or j >= self.map_width:
+                continue
+            k = i * self.map_width + j
+            was_lit = self.lit[k] > 0
+            self.lit[k] += delta
+            if was_lit != (self.lit[k] > 0):
+                self.row_counts[i] += delta
@@ -1,6 +1,7 @@
 import curses
 
 from gamelib.Room import Room
+import gamelib.EnvVars as EnvVars
 
 class Map:
     def __init__(self, path: str):
@@ -30,6 +31,15 @@ class Map:
         self.width = len(tile_lines[0])
 
         self._map_coords = dict()
+        # var name -> bit mask of the tiles it reveals, tile i, j is bit i * width + j
+        self._var_masks = dict()
+        self._var_slots = dict()
+        # bits of the tiles whose var is set to true
+        self.discovered = 0
+        # bumped whenever a tile is discovered or hidden again
+        self.version = 0
+        self._viewport_key = None
+        self._viewport = None
 
         for i in range(self.height):
             self.tiles += [[]]
@@ -39,25 +49,65 @@ class Map:
                 room = split[j].split(' ')[0]
                 var = split[j].split(' ')[1]
                 self.tiles[i] += [Tile(char, room, var)]
+                self._var_masks[var] = self._var_masks.get(var, 0) | (1 << (i * self.width + j))
+                self._var_slots[EnvVars.intern(var)] = var
 
                 self._map_coords[room] = [i, j]
 
-    def get_mini_tiles(self, room_name: str, env_vars: dict, h: int, w: int, hh: int, hw: int):
+    def set_var(self, var: str, value):
+        if not var in self._var_masks:
+            return
+        mask = self._var_masks[var]
+        if value == True:
+            discovered = self.discovered | mask
+        else:
+            discovered = self.discovered & ~mask
+        if discovered != self.discovered:
+            self.discovered = discovered
+            self.version += 1
+
+    def attach(self, env_vars: EnvVars.EnvVars):
+        # the discovered tiles follow the vars from now on
+        for slot in self._var_slots:
+            env_vars.subscribe(slot, self.on_var)
+        self.sync_vars(env_vars)
+
+    def on_var(self, slot: int, value):
+        self.set_var(self._var_slots[slot], value)
+
+    def sync_vars(self, env_vars: EnvVars.EnvVars):
+        # rebuilds the discovered tiles from scratch, for when the vars are replaced as a whole
+        discovered = 0
+        for var in self._var_masks:
+            if var in env_vars and env_vars[var] == True:
+                discovered |= self._var_masks[var]
+        if discovered != self.discovered:
+            self.discovered = discovered
+            self.version += 1
+
+    def is_discovered(self, i: int, j: int):
+        return (self.discovered >> (i * self.width + j)) & 1 == 1
+
+    def get_mini_tiles(self, room_name: str, h: int, w: int, hh: int, hw: int):
         if not room_name in self._map_coords.keys():
             raise Exception(f'ERR: room {room_name} not in map coords')
+        # the viewport only changes when the player changes rooms or a tile is discovered
+        key = (room_name, self.version, h, w, hh, hw)
+        if key == self._viewport_key:
+            return self._viewport
         y, x = self._map_coords[room_name]
         result = []
         for i in range(h):
             result += [[]]
+            modi = y + i - hh
             for j in range(w):
                 char = ' '
-                modi = y + i - hh
                 modj = x + j - hw
-                if modi >= 0 and modj >= 0 and modi < self.height and modj < self.width:
-                    tile = self.tiles[modi][modj]
-                    if tile.var in env_vars.keys() and env_vars[tile.var] == True:
-                        char = tile.char
+                if modi >= 0 and modj >= 0 and modi < self.height and modj < self.width and self.is_discovered(modi, modj):
+                    char = self.tiles[modi][modj].char
                 result[i] += [char]
+        self._viewport_key = key
+        self._viewport = result
         return result
 
 class Tile:
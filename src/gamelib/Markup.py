@@ -0,0 +1,107 @@
+import curses
+import re
+from collections import OrderedDict
+from threading import Lock
+
+# color coded text: '#<fg>-<bg> ' switches the color of the text that follows, '#normal ' switches it back,
+# the single space after the color name is not displayed
+COLOR_NAMES = {
+    'black': curses.COLOR_BLACK,
+    'red': curses.COLOR_RED,
+    'green': curses.COLOR_GREEN,
+    'yellow': curses.COLOR_YELLOW,
+    'blue': curses.COLOR_BLUE,
+    'magenta': curses.COLOR_MAGENTA,
+    'cyan': curses.COLOR_CYAN,
+    'white': curses.COLOR_WHITE
+}
+
+# for color names that are glued to the text, like '#magenta-black5'
+GLUED_COLOR = re.compile(r'(normal|[a-z]+-[a-z]+)(.*)', re.DOTALL)
+
+class ColorPairs:
+    def __init__(self):
+        # color name -> color attribute, each pair is set up once, the first time its name is compiled
+        self.attrs = dict()
+        # pairs are handed out from the top of the range, the bottom is left to ncursesui
+        self.last_pair = None
+
+    def get_attr(self, name: str):
+        if name == 'normal':
+            return 0
+        if name in self.attrs:
+            return self.attrs[name]
+        attr = 0
+        if is_color_name(name):
+            colors = name.split('-')
+            try:
+                if self.last_pair == None:
+                    # attributes only have room for 256 pairs
+                    self.last_pair = min(getattr(curses, 'COLOR_PAIRS', 256), 256)
+                if self.last_pair > 1:
+                    self.last_pair -= 1
+                    curses.init_pair(self.last_pair, COLOR_NAMES[colors[0]], COLOR_NAMES[colors[1]])
+                    attr = curses.color_pair(self.last_pair)
+            except curses.error:
+                attr = 0
+        self.attrs[name] = attr
+        return attr
+
+class MarkupCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # message -> [runs, length], where runs is a tuple of (text, color attribute)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, message: str):
+        with self.lock:
+            if message in self.entries:
+                self.entries.move_to_end(message)
+                self.hits += 1
+                return self.entries[message]
+            self.misses += 1
+        result = compile_markup(message)
+        with self.lock:
+            self.entries[message] = result
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+color_pairs = ColorPairs()
+markup_cache = MarkupCache(1024)
+
+def is_color_name(name: str):
+    colors = name.split('-')
+    return name == 'normal' or (len(colors) == 2 and colors[0] in COLOR_NAMES and colors[1] in COLOR_NAMES)
+
+def compile_markup(message: str):
+    runs = []
+    split = message.split('#')
+    if split[0] != '':
+        runs += [(split[0], 0)]
+    for part in split[1:]:
+        name, sep, text = part.partition(' ')
+        if not is_color_name(name):
+            match = GLUED_COLOR.match(part)
+            if match != None and is_color_name(match.group(1)):
+                name, text = match.groups()
+        if text != '':
+            runs += [(text, color_pairs.get_attr(name))]
+    runs = tuple(runs)
+    return [runs, sum(len(run[0]) for run in runs)]
+
+def cct_len(message: str):
+    return markup_cache.get(message)[1]
+
+def put(window, y: int, x: int, message: str, attr: int=0):
+    # same as ncursesui's put, but the message is only parsed the first time it is seen
+    for text, color_attr in markup_cache.get(message)[0]:
+        window.addstr(y, x, text, color_attr | attr)
+        x += len(text)
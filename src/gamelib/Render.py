@@ -0,0 +1,392 @@
+import curses
+import logging
+from collections import deque
+
+# plain characters used for the line drawing constants when curses is never initialized
+ACS_FALLBACKS = {
+    'ACS_VLINE': '|',
+    'ACS_HLINE': '-',
+    'ACS_ULCORNER': '+',
+    'ACS_URCORNER': '+',
+    'ACS_LLCORNER': '+',
+    'ACS_LRCORNER': '+',
+    'ACS_LTEE': '+',
+    'ACS_RTEE': '+',
+    'ACS_TTEE': '+',
+    'ACS_BTEE': '+',
+    'ACS_PLUS': '+',
+    'ACS_UARROW': '^',
+    'ACS_DARROW': 'v',
+    'ACS_LARROW': '<',
+    'ACS_RARROW': '>'
+}
+
+# the real curses functions, FrameBufferBackend.install replaces the ones in the curses module
+CURSES_FUNCTIONS = {
+    'newwin': curses.newwin,
+    'napms': curses.napms,
+    'flash': curses.flash,
+    'beep': curses.beep,
+    'curs_set': curses.curs_set,
+    'doupdate': curses.doupdate
+}
+
+class InputExhausted(Exception):
+    # raised by getch once a headless run is out of keys
+    pass
+
+class CursesBackend:
+    def newwin(self, height: int, width: int, y: int=0, x: int=0):
+        return CURSES_FUNCTIONS['newwin'](height, width, y, x)
+
+    def napms(self, ms: int):
+        return CURSES_FUNCTIONS['napms'](ms)
+
+    def flash(self):
+        CURSES_FUNCTIONS['flash']()
+
+    def curs_set(self, visibility: int):
+        CURSES_FUNCTIONS['curs_set'](visibility)
+
+    def doupdate(self):
+        CURSES_FUNCTIONS['doupdate']()
+
+class FrameBufferWindow:
+    def __init__(self, backend: 'FrameBufferBackend', height: int, width: int, y: int, x: int):
+        self.backend = backend
+        self.height = height
+        self.width = width
+        self.y = y
+        self.x = x
+        self.cursor_y = 0
+        self.cursor_x = 0
+        self.attr = 0
+        self.erase()
+
+    def erase(self):
+        self.cells = [[(' ', 0)] * self.width for _ in range(self.height)]
+
+    def clear(self):
+        self.erase()
+
+    def addch(self, *args):
+        # addch([y, x,] ch[, attr])
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            args = args[2:]
+        ch = args[0]
+        attr = self.attr
+        if len(args) > 1:
+            attr |= args[1]
+        if isinstance(ch, int):
+            attr |= ch & ~0xff
+            ch = chr(ch & 0xff)
+        self._write(ch, attr)
+
+    def addstr(self, *args):
+        # addstr([y, x,] str[, attr])
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            args = args[2:]
+        attr = self.attr
+        if len(args) > 1:
+            attr |= args[1]
+        for ch in args[0]:
+            self._write(ch, attr)
+
+    def addnstr(self, *args):
+        if len(args) >= 4:
+            self.addstr(args[0], args[1], args[2][:args[3]], *args[4:])
+        else:
+            self.addstr(args[0][:args[1]], *args[2:])
+
+    def move(self, y: int, x: int):
+        if y < 0 or x < 0 or y >= self.height or x >= self.width:
+            raise curses.error('wmove() returned ERR')
+        self.cursor_y = y
+        self.cursor_x = x
+
+    def box(self, vertch=0, horch=0):
+        self.border(vertch, vertch, horch, horch)
+
+    def border(self, ls=0, rs=0, ts=0, bs=0, tl=0, tr=0, bl=0, br=0):
+        ls = ls or curses.ACS_VLINE
+        rs = rs or curses.ACS_VLINE
+        ts = ts or curses.ACS_HLINE
+        bs = bs or curses.ACS_HLINE
+        h = self.height - 1
+        w = self.width - 1
+        for i in range(1, h):
+            self._put(i, 0, ls)
+            self._put(i, w, rs)
+        for j in range(1, w):
+            self._put(0, j, ts)
+            self._put(h, j, bs)
+        self._put(0, 0, tl or curses.ACS_ULCORNER)
+        self._put(0, w, tr or curses.ACS_URCORNER)
+        self._put(h, 0, bl or curses.ACS_LLCORNER)
+        self._put(h, w, br or curses.ACS_LRCORNER)
+
+    def hline(self, *args):
+        # hline([y, x,] ch, n)
+        if len(args) == 4:
+            self.move(args[0], args[1])
+            args = args[2:]
+        ch, n = args
+        for j in range(self.cursor_x, min(self.width, self.cursor_x + n)):
+            self._put(self.cursor_y, j, ch)
+
+    def vline(self, *args):
+        # vline([y, x,] ch, n)
+        if len(args) == 4:
+            self.move(args[0], args[1])
+            args = args[2:]
+        ch, n = args
+        for i in range(self.cursor_y, min(self.height, self.cursor_y + n)):
+            self._put(i, self.cursor_x, ch)
+
+    def attron(self, attr: int):
+        self.attr |= attr
+
+    def attroff(self, attr: int):
+        self.attr &= ~attr
+
+    def attrset(self, attr: int):
+        self.attr = attr
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def getbegyx(self):
+        return (self.y, self.x)
+
+    def getyx(self):
+        return (self.cursor_y, self.cursor_x)
+
+    def getch(self, *args):
+        if len(args) == 2:
+            self.move(args[0], args[1])
+        return self.backend.next_key()
+
+    def getkey(self, *args):
+        return chr(self.backend.next_key())
+
+    # editing, for curses.textpad
+
+    def inch(self, *args):
+        # inch([y, x]), the character and its attributes in one int
+        if len(args) == 2:
+            self.move(args[0], args[1])
+        ch, attr = self.cells[self.cursor_y][self.cursor_x]
+        return ord(ch) | attr
+
+    def delch(self, *args):
+        if len(args) == 2:
+            self.move(args[0], args[1])
+        row = self.cells[self.cursor_y]
+        self.cells[self.cursor_y] = row[:self.cursor_x] + row[self.cursor_x + 1:] + [(' ', 0)]
+
+    def insch(self, *args):
+        # insch([y, x,] ch[, attr])
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            args = args[2:]
+        ch = args[0]
+        attr = self.attr
+        if len(args) > 1:
+            attr |= args[1]
+        if isinstance(ch, int):
+            attr |= ch & ~0xff
+            ch = chr(ch & 0xff)
+        row = self.cells[self.cursor_y]
+        self.cells[self.cursor_y] = (row[:self.cursor_x] + [(ch, attr)] + row[self.cursor_x:])[:self.width]
+
+    def clrtoeol(self):
+        row = self.cells[self.cursor_y]
+        for j in range(self.cursor_x, self.width):
+            row[j] = (' ', 0)
+
+    def clrtobot(self):
+        self.clrtoeol()
+        for i in range(self.cursor_y + 1, self.height):
+            self.cells[i] = [(' ', 0)] * self.width
+
+    def deleteln(self):
+        self.cells.pop(self.cursor_y)
+        self.cells += [[(' ', 0)] * self.width]
+
+    def insertln(self):
+        self.cells.insert(self.cursor_y, [(' ', 0)] * self.width)
+        self.cells.pop()
+
+    def refresh(self):
+        self.noutrefresh()
+        self.backend.doupdate()
+
+    def noutrefresh(self):
+        self.backend.blit(self)
+
+    # curses settings that mean nothing without a terminal
+    def keypad(self, flag): pass
+    def nodelay(self, flag): pass
+    def timeout(self, delay): pass
+    def touchwin(self): pass
+    def scrollok(self, flag): pass
+    def leaveok(self, flag): pass
+    def bkgd(self, *args): pass
+
+    def _put(self, y: int, x: int, ch):
+        attr = 0
+        if isinstance(ch, int):
+            attr = ch & ~0xff
+            ch = chr(ch & 0xff)
+        self.cells[y][x] = (ch, attr)
+
+    def _write(self, ch: str, attr: int):
+        # same as curses: text wraps to the next line, writing past the last cell is an error
+        if self.cursor_y >= self.height:
+            raise curses.error('addwstr() returned ERR')
+        self.cells[self.cursor_y][self.cursor_x] = (ch, attr)
+        self.cursor_x += 1
+        if self.cursor_x >= self.width:
+            self.cursor_x = 0
+            self.cursor_y += 1
+            if self.cursor_y >= self.height:
+                self.cursor_y = self.height - 1
+                self.cursor_x = self.width - 1
+                raise curses.error('addwstr() returned ERR')
+
+class FrameBufferBackend:
+    def __init__(self, height: int, width: int, keys: list[int]=[]):
+        # keys are handed out to getch in order
+        self.height = height
+        self.width = width
+        self.keys = deque(keys)
+        self.screen = [[(' ', 0)] * width for _ in range(height)]
+        self.frames = 0
+        self.slept = 0
+        self.stdscr = FrameBufferWindow(self, height, width, 0, 0)
+
+    def newwin(self, height: int, width: int, y: int=0, x: int=0):
+        return FrameBufferWindow(self, height, width, y, x)
+
+    def napms(self, ms: int):
+        # no real waiting, the time is only recorded
+        self.slept += ms
+
+    def flash(self):
+        pass
+
+    def curs_set(self, visibility: int):
+        pass
+
+    def push_keys(self, keys: list[int]):
+        self.keys += keys
+
+    def next_key(self):
+        if len(self.keys) == 0:
+            raise InputExhausted('ERR: headless input exhausted')
+        return self.keys.popleft()
+
+    def blit(self, window: FrameBufferWindow):
+        for i in range(window.height):
+            y = window.y + i
+            if y < 0 or y >= self.height:
+                continue
+            row = self.screen[y]
+            for j in range(window.width):
+                x = window.x + j
+                if x >= 0 and x < self.width:
+                    row[x] = window.cells[i][j]
+
+    def doupdate(self):
+        self.frames += 1
+
+    def get_frame(self):
+        # the screen as text, one string per row
+        return [''.join(cell[0] for cell in row) for row in self.screen]
+
+    def get_attrs(self):
+        return [[cell[1] for cell in row] for row in self.screen]
+
+    def install(self):
+        # the line drawing constants and colors only exist once curses has been initialized,
+        # give them plain stand-ins so that the game code can run without a terminal
+        for name in ACS_FALLBACKS:
+            if not hasattr(curses, name):
+                setattr(curses, name, ord(ACS_FALLBACKS[name]))
+        curses.color_pair = lambda pair: pair << 8
+        curses.init_pair = lambda pair, fg, bg: None
+        curses.start_color = lambda: None
+        curses.use_default_colors = lambda: None
+        curses.has_colors = lambda: False
+        # ncursesui and curses.textpad call curses themselves, their windows have to end up here too
+        curses.newwin = newwin
+        curses.napms = napms
+        curses.flash = flash
+        curses.beep = flash
+        curses.curs_set = curs_set
+        curses.doupdate = doupdate
+        use(self)
+
+class FrameBufferParent:
+    # stands in for the ncursesui window the game, combat and trade screens are opened from
+    def __init__(self, backend: FrameBufferBackend):
+        self.window = backend.stdscr
+        self.HEIGHT = backend.height
+        self.WIDTH = backend.width
+
+    def get_window(self):
+        return self.window
+
+class Compositor:
+    def __init__(self):
+        # windows are staged with noutrefresh during the turn and the terminal is updated once by flush
+        self.pending = 0
+        self.flushes = 0
+        self.turn = 0
+
+    def stage(self, *windows):
+        for window in windows:
+            window.noutrefresh()
+        self.pending += len(windows)
+
+    def show(self, *windows):
+        # for screens that wait for a key or sleep right after drawing, they can't wait for the end of the turn
+        self.stage(*windows)
+        self.flush()
+
+    def flush(self):
+        if self.pending == 0:
+            return
+        self.pending = 0
+        self.flushes += 1
+        backend.doupdate()
+
+    def end_turn(self):
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f'turn {self.turn}: {self.flushes} flushes')
+        self.turn += 1
+        self.flushes = 0
+
+backend = CursesBackend()
+compositor = Compositor()
+
+def use(new_backend):
+    global backend
+    backend = new_backend
+
+def newwin(height: int, width: int, y: int=0, x: int=0):
+    return backend.newwin(height, width, y, x)
+
+def napms(ms: int):
+    return backend.napms(ms)
+
+def flash():
+    backend.flash()
+
+def curs_set(visibility: int):
+    backend.curs_set(visibility)
+
+def doupdate():
+    backend.doupdate()
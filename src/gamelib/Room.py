@@ -1,10 +1,23 @@
 import json
-from os import listdir
-from os.path import isfile, join, splitext
+import logging
+from array import array
+from collections import OrderedDict
+from hashlib import sha1
+from os import makedirs, replace, stat
+from os.path import abspath, basename, join, splitext
+from queue import Queue
+from threading import Lock, Thread, get_ident
 from Configuraion import ConfigFile
 from gamelib.Entities import Enemy
+from gamelib.DirectoryIndex import DirectoryIndex
+from gamelib.Lightmap import Lightmap
+from gamelib.SpatialHash import SpatialHash
 
 import gamelib.Items as Items
+import gamelib.Content as Content
+import gamelib.Script as Script
+import gamelib.EnvVars as EnvVars
+import gamelib.FOV as FOV
 
 
 class Tile:
@@ -16,9 +29,9 @@ class Tile:
 
     def from_info(tile_char: str, tiles_data: dict, scripts: dict, containers_info: dict, config_file: ConfigFile):
         if tile_char == ' ' or tile_char == '@':
-            return Tile('floor', ' ', False, False)
+            return FLOOR_TILE
         if tile_char == '#':
-            return Tile('wall', '#', True, False)
+            return WALL_TILE
         if tile_char in tiles_data.keys():
             tile_name = tiles_data[tile_char][0]
             tile_actual_char = tiles_data[tile_char][1]
@@ -42,7 +55,7 @@ class Tile:
                 split = tile_data.split()
                 signal = split[0]
                 if len(split) == 1:
-                    return HiddenTile(tile_name, tile_actual_char, True, False, Tile('floor', ' ', False, False), signal)
+                    return HiddenTile(tile_name, tile_actual_char, True, False, FLOOR_TILE, signal)
 
                 actual_tile_tile_char = split[1]
                 actual_tile_tiles_data = dict()
@@ -52,7 +65,7 @@ class Tile:
                 actual_tile = Tile.from_info(actual_tile_tile_char, actual_tile_tiles_data, scripts, containers_info, config_file)
                 return HiddenTile(tile_name, tile_actual_char, True, False, actual_tile, signal)
         # in case of unknown tile
-        return Tile('ERR', '!', True, False)
+        return UNKNOWN_TILE
 
 class DoorTile(Tile):
     def __init__(self, name: str, char: str, solid: bool, info: str):
@@ -90,25 +103,556 @@ class CookingPotTile(Tile):
     def __init__(self, char: str):
         super().__init__('Cooking pot', char, True, True)
 
+# shared prototypes of the stateless tiles, never mutate these
+FLOOR_TILE = Tile('floor', ' ', False, False)
+WALL_TILE = Tile('wall', '#', True, False)
+UNKNOWN_TILE = Tile('ERR', '!', True, False)
+
+class TileRegistry:
+    # all cells with the same layout char share one tile object, per-cell state is kept by the room
+    def __init__(self, tiles_data: dict, scripts: dict, containers_info: dict, config_file: ConfigFile):
+        self.tiles_data = tiles_data
+        self.scripts = scripts
+        self.containers_info = containers_info
+        self.config_file = config_file
+        self.prototypes = {}
+
+    def get(self, tile_char: str):
+        if not tile_char in self.prototypes:
+            self.prototypes[tile_char] = Tile.from_info(tile_char, self.tiles_data, self.scripts, self.containers_info, self.config_file)
+        return self.prototypes[tile_char]
+
 class Room:
     def __init__(self, name: str, height: int, width: int, player_spawn_char: str='@'):
         self.name = name
         self.display_name = ''
         self.height = height
         self.width = width
-        self.tiles = []
+        # kinds holds one palette id per cell, solid and interactable are packed bitmaps over the same cells
+        self.tile_kinds = []
+        self.kinds = bytearray()
+        self.solid_bits = bytearray()
+        self.interactable_bits = bytearray()
+        self.signal_cells = {}
+        # env var slot -> signal name, the room listens to these while it is the current room
+        self.signal_slots = {}
+        self.attached_env_vars = None
+        # signals whose hidden tiles are currently revealed
+        self.signal_state = frozenset()
+        # cells lit by torches, hidden torches are added once their signal reveals them
+        self.lightmap = Lightmap(height, width, 0)
+        self.lit_hidden_torches = set()
+        self.layout = []
         self.player_spawn_y = 0
         self.player_spawn_x = 0
         self.visible_range = 0
         self.container_info = {}
+        self.enemies_data = {}
+        self.enemy_templates = {}
+        # enemy code -> env var slots of its y, x, health and mana
+        self.enemy_slots = {}
+        # live enemies by position, enemy_order keeps the room file order for ties
+        self.enemy_index = SpatialHash()
+        self.enemy_order = {}
+        self.doors = {}
+        self.spawn_markers = {}
+        self.tile_positions = {}
         self.player_spawn_char = player_spawn_char
 
-    def by_name(name: str, config_file: ConfigFile, env_vars: dict, door_code: str=None):
+    def by_name(name: str, config_file: ConfigFile, env_vars: EnvVars.EnvVars, door_code: str=None):
         r_p = config_file.get('Rooms path')
-        room_names = [f for f in listdir(r_p) if isfile(join(r_p, f)) and splitext(f)[1] == '.room']
-        if not f'{name}.room' in room_names:
+        path, source = Room.find_source(name, r_p)
+        if path == None:
             raise Exception(f'ERR: room with name {name} not found in {r_p}')
-        raw_data = open(f'{r_p}/{name}.room', 'r').read()
+        if config_file.has('Room pool size'):
+            room_pool.resize(int(config_file.get('Room pool size')))
+        result = room_pool.get(path, source)
+        if door_code != None:
+            room_prefetcher.count_transition(result != None)
+        if result == None:
+            result = Room.load_template(name, path, config_file)
+            room_pool.put(path, result, source)
+        result.rehydrate(env_vars, door_code)
+        if config_file.has('Prefetch depth'):
+            room_prefetcher.prefetch(result, config_file)
+        return result
+
+    def find_source(name: str, rooms_path: str):
+        # returns the path the room is pooled under and the file whose mtime invalidates it
+        pack = Content.registry.get_pack()
+        if pack != None and pack.has_entry(rooms_path, name):
+            return [f'{rooms_path}/{name}.room', pack.path]
+        path = DirectoryIndex.get(rooms_path, '.room').get_path(name)
+        return [path, path]
+
+    def load_template(name: str, path: str, config_file: ConfigFile):
+        r_p = config_file.get('Rooms path')
+        pack = Content.registry.get_pack()
+        if pack != None and pack.has_entry(r_p, name):
+            compiled = CompiledRoom.from_json(pack.get_entry(r_p, name))
+            return Room.from_compiled(compiled, '@', config_file)
+        cache_path = None
+        if config_file.has('Room cache path'):
+            cache_path = config_file.get('Room cache path')
+        compiled = CompiledRoom.load(name, path, cache_path)
+        return Room.from_compiled(compiled, '@', config_file)
+
+    def peek_size(name: str, path: str, config_file: ConfigFile):
+        # size in tiles, read from the layout without building the room
+        r_p = config_file.get('Rooms path')
+        pack = Content.registry.get_pack()
+        if pack != None and pack.has_entry(r_p, name):
+            layout = pack.get_entry(r_p, name)['layout']
+        else:
+            layout = open(path, 'r').read().split('\n---\n', 1)[0].split('\n')
+        return len(layout) * len(layout[0])
+
+    def from_str(name: str, layout_data: dict, raw_tiles_data: dict, room_data: dict, scripts_data: dict, containers_data: dict, enemies_data: dict, player_spawn_char: str, config_file: ConfigFile, door_code: str, env_vars: EnvVars.EnvVars):
+        compiled = CompiledRoom.from_sections(name, layout_data, raw_tiles_data, room_data, scripts_data, containers_data, enemies_data)
+        result = Room.from_compiled(compiled, player_spawn_char, config_file)
+        result.rehydrate(env_vars, door_code)
+        return result
+
+    def from_compiled(compiled: 'CompiledRoom', player_spawn_char: str, config_file: ConfigFile):
+        name = compiled.name
+        lines = compiled.layout
+        height = len(lines)
+        width = len(lines[0])
+        result = Room('', height, width, player_spawn_char)
+        result.name = name
+        result.layout = lines
+        result.visible_range = compiled.visible_range
+        result.display_name = compiled.display_name
+        result.doors = compiled.doors
+        result.spawn_markers = compiled.spawn_markers
+        result.tile_positions = compiled.tile_positions
+
+        # scripts
+        result.scripts = dict()
+        for script_name in compiled.scripts:
+            result.scripts[script_name] = list(compiled.scripts[script_name])
+        # parsed once here, pooled rooms keep them for every visit
+        result.compiled_scripts = Script.compile_scripts(result.scripts)
+
+        # chest contents
+        result.container_info = dict()
+        for container_code in compiled.containers:
+            d = dict()
+            raw_container_info = compiled.containers[container_code]
+            for i in range(len(raw_container_info)):
+                amount, item_name = raw_container_info[i]
+                if amount != None and item_name == 'Gold':
+                    item = Items.GoldPouch()
+                else:
+                    item = Items.Item.get_base_items([item_name], config_file.get('Items path'))[0]
+                if amount != None:
+                    item.amount = amount
+                d[item] = f'{container_code}_{i}'
+            result.container_info[container_code] = d
+
+        # enemy templates, the actual enemies are created from them in rehydrate
+        result.enemy_templates = dict()
+        for enemy_code in compiled.enemies:
+            e_type, y, x = compiled.enemies[enemy_code]
+            enemy = Enemy()
+            if e_type != None:
+                enemy = Enemy.from_enemy_name(e_type, config_file)
+            enemy.y = y
+            enemy.x = x
+            enemy.max_mana = enemy.mana
+            result.enemy_templates[enemy_code] = enemy
+            var_start = f'enemies_{name}_{enemy_code}_'
+            result.enemy_slots[enemy_code] = tuple(EnvVars.intern(f'{var_start}{field}') for field in ['y', 'x', 'health', 'mana'])
+
+        # file the layout
+        registry = TileRegistry(compiled.tiles_data, result.scripts, result.container_info, config_file)
+        for line in lines:
+            if len(line) < width:
+                raise Exception(f'ERR: Incorrect room layout, all lines should be {width} chars long. Room name: {name}')
+        layout = ''.join([line[:width] for line in lines])
+        kind_ids = dict()
+        for tile_char in layout:
+            if not tile_char in kind_ids:
+                kind_ids[tile_char] = len(result.tile_kinds)
+                result.tile_kinds += [registry.get(tile_char)]
+        table = {ord(tile_char): kind_ids[tile_char] for tile_char in kind_ids}
+        if len(result.tile_kinds) <= 256:
+            result.kinds = bytearray(layout.translate(table).encode('latin-1'))
+        else:
+            result.kinds = array('H', [kind_ids[tile_char] for tile_char in layout])
+
+        # bitmaps
+        size = height * width
+        result.solid_bits = bytearray((size + 7) // 8)
+        result.interactable_bits = bytearray((size + 7) // 8)
+        result.signal_cells = dict()
+        # kind id -> [solid, interactable, signal cells or None], None for kinds that need nothing
+        specials = []
+        for tile in result.tile_kinds:
+            if not tile.solid and not tile.interactable and not isinstance(tile, HiddenTile):
+                specials += [None]
+                continue
+            cells = None
+            if isinstance(tile, HiddenTile):
+                if not tile.signal in result.signal_cells:
+                    result.signal_cells[tile.signal] = []
+                    result.signal_slots[EnvVars.intern(tile.signal)] = tile.signal
+                cells = result.signal_cells[tile.signal]
+            specials += [[tile.solid, tile.interactable, cells]]
+        # one pass over the grid for all the kinds
+        kinds = result.kinds
+        solid_bits = result.solid_bits
+        interactable_bits = result.interactable_bits
+        for i in range(size):
+            special = specials[kinds[i]]
+            if special == None:
+                continue
+            solid, interactable, cells = special
+            if solid:
+                solid_bits[i >> 3] |= 1 << (i & 7)
+            if interactable:
+                interactable_bits[i >> 3] |= 1 << (i & 7)
+            if cells != None:
+                cells += [i]
+
+        # lightmap
+        margin = 0
+        for tile in result.tile_kinds:
+            if isinstance(tile, HiddenTile):
+                tile = tile.actual_tile
+            if isinstance(tile, TorchTile):
+                margin = max(margin, tile.visible_range)
+        result.lightmap = Lightmap(height, width, margin)
+        for i, j in result.get_tile_positions('torch'):
+            tile = result.tile_at(i, j)
+            if isinstance(tile, TorchTile):
+                result.lightmap.add_light(i, j, tile.visible_range)
+        return result
+
+    def rehydrate(self, env_vars: EnvVars.EnvVars, door_code: str=None):
+        # enemies
+        self.enemies_data = dict()
+        for enemy_code in self.enemy_templates:
+            enemy = self.enemy_templates[enemy_code].copy()
+            y_slot, x_slot, health_slot, mana_slot = self.enemy_slots[enemy_code]
+            # fill the values from env_vars
+            # y pos
+            enemy.y = env_vars.get_slot(y_slot, enemy.y)
+            env_vars.set_slot(y_slot, enemy.y)
+            # x pos
+            enemy.x = env_vars.get_slot(x_slot, enemy.x)
+            env_vars.set_slot(x_slot, enemy.x)
+
+            # health
+            enemy.health = env_vars.get_slot(health_slot, enemy.health)
+            env_vars.set_slot(health_slot, enemy.health)
+
+            # mana
+            enemy.mana = env_vars.get_slot(mana_slot, enemy.mana)
+            env_vars.set_slot(mana_slot, enemy.mana)
+            # if enemy.health > 0:
+            self.enemies_data[enemy_code] = enemy
+
+        self.enemy_index.clear()
+        self.enemy_order = dict()
+        for enemy_code in self.enemies_data:
+            self.enemy_order[enemy_code] = len(self.enemy_order)
+            self.update_enemy(enemy_code)
+
+        # hidden tiles
+        self.attach(env_vars)
+
+        # find the player spawn point
+        if not door_code:
+            self.player_spawn_y, self.player_spawn_x = self.get_marker_position(self.player_spawn_char, [1, 1])
+        else:
+            self.player_spawn_y, self.player_spawn_x = [0, 0]
+            if door_code in self.doors:
+                self.player_spawn_y, self.player_spawn_x = self.doors[door_code]
+
+    def update_enemy(self, enemy_code: str):
+        # call whenever an enemy moves, dies or comes back to life
+        enemy = self.enemies_data[enemy_code]
+        if enemy.health > 0 and not (enemy.y == -1 and enemy.x == -1):
+            self.enemy_index.move(enemy_code, enemy.y, enemy.x)
+        else:
+            self.enemy_index.remove(enemy_code)
+
+    def get_enemies_within(self, y: int, x: int, radius):
+        # codes of live enemies at most radius away from y, x
+        return sorted(self.enemy_index.query_radius(y, x, radius), key=lambda code: self.enemy_order[code])
+
+    def get_enemies_in_rect(self, y_from: int, x_from: int, y_to: int, x_to: int):
+        return sorted(self.enemy_index.query_rect(y_from, x_from, y_to, x_to), key=lambda code: self.enemy_order[code])
+
+    def get_marker_position(self, char: str, default: list[int]):
+        if char in self.spawn_markers:
+            return self.spawn_markers[char]
+        if char == ' ' or char == '#':
+            # floor and walls are too common to be indexed
+            for i in range(self.height - 1, -1, -1):
+                j = self.layout[i][:self.width].rfind(char)
+                if j != -1:
+                    return [i, j]
+        return default
+
+    def get_tile_positions(self, tile_name: str):
+        if not tile_name in self.tile_positions:
+            return []
+        return self.tile_positions[tile_name]
+
+    def get_size(self):
+        return self.height * self.width
+
+    def get_door_destinations(self):
+        result = []
+        for tile in self.tile_kinds:
+            if isinstance(tile, HiddenTile):
+                tile = tile.actual_tile
+            if isinstance(tile, DoorTile) and not tile.to in result:
+                result += [tile.to]
+        return result
+
+    def tile_at(self, y: int, x: int):
+        return self.tile_kinds[self.kinds[y * self.width + x]]
+
+    def is_solid(self, y: int, x: int):
+        i = y * self.width + x
+        return self.solid_bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def is_interactable(self, y: int, x: int):
+        i = y * self.width + x
+        return self.interactable_bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def set_signal(self, signal: str, value):
+        if not signal in self.signal_cells:
+            return
+        revealed = value == True
+        if revealed != (signal in self.signal_state):
+            if revealed:
+                self.signal_state = self.signal_state | {signal}
+            else:
+                self.signal_state = self.signal_state - {signal}
+        for i in self.signal_cells[signal]:
+            tile = self.tile_kinds[self.kinds[i]]
+            solid = tile.actual_tile.solid if revealed else True
+            interactable = tile.actual_tile.interactable if revealed else False
+            bit = 1 << (i & 7)
+            if solid:
+                self.solid_bits[i >> 3] |= bit
+            else:
+                self.solid_bits[i >> 3] &= ~bit
+            if interactable:
+                self.interactable_bits[i >> 3] |= bit
+            else:
+                self.interactable_bits[i >> 3] &= ~bit
+            if isinstance(tile.actual_tile, TorchTile) and revealed != (i in self.lit_hidden_torches):
+                y, x = divmod(i, self.width)
+                if revealed:
+                    self.lit_hidden_torches.add(i)
+                    self.lightmap.add_light(y, x, tile.actual_tile.visible_range)
+                else:
+                    self.lit_hidden_torches.remove(i)
+                    self.lightmap.remove_light(y, x, tile.actual_tile.visible_range)
+
+    def apply_signals(self, env_vars: EnvVars.EnvVars):
+        for signal in self.signal_cells:
+            self.set_signal(signal, env_vars[signal] if signal in env_vars else None)
+
+    def attach(self, env_vars: EnvVars.EnvVars):
+        # from now on only the signals that change are applied, see on_signal
+        self.detach()
+        self.attached_env_vars = env_vars
+        for slot in self.signal_slots:
+            env_vars.subscribe(slot, self.on_signal)
+        self.apply_signals(env_vars)
+
+    def detach(self):
+        if self.attached_env_vars == None:
+            return
+        for slot in self.signal_slots:
+            self.attached_env_vars.unsubscribe(slot, self.on_signal)
+        self.attached_env_vars = None
+
+    def on_signal(self, slot: int, value):
+        self.set_signal(self.signal_slots[slot], value)
+
+class RoomPool:
+    def __init__(self, max_size: int):
+        # max_size is measured in tiles, so that one huge room weighs as much as many small ones
+        self.max_size = max_size
+        self.size = 0
+        self.rooms = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # the pool is shared with the prefetcher thread
+        self.lock = Lock()
+
+    def get(self, path: str, source: str=None):
+        # source is the file the room was loaded from, if it is not the room file itself
+        if source == None:
+            source = path
+        with self.lock:
+            if not path in self.rooms:
+                self.misses += 1
+                return None
+            mtime, room = self.rooms[path]
+            if stat(source).st_mtime_ns != mtime:
+                # room file was edited, drop the stale template
+                self._remove(path)
+                self.misses += 1
+                return None
+            self.rooms.move_to_end(path)
+            self.hits += 1
+            return room
+
+    def peek(self, path: str):
+        # same as get, but does not count as a visit
+        with self.lock:
+            if not path in self.rooms:
+                return None
+            return self.rooms[path][1]
+
+    def put(self, path: str, room: Room, source: str=None):
+        if source == None:
+            source = path
+        with self.lock:
+            if path in self.rooms:
+                self._remove(path)
+            if room.get_size() > self.max_size:
+                return
+            self.rooms[path] = [stat(source).st_mtime_ns, room]
+            self.size += room.get_size()
+            while self.size > self.max_size:
+                oldest = next(iter(self.rooms))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def resize(self, max_size: int):
+        with self.lock:
+            self.max_size = max_size
+            while self.size > self.max_size:
+                oldest = next(iter(self.rooms))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.rooms.clear()
+            self.size = 0
+        FOV.fov_cache.clear()
+
+    def log_stats(self):
+        with self.lock:
+            logging.debug(f'room pool: {self.hits} hits, {self.misses} misses, {self.evictions} evictions, {len(self.rooms)} rooms, {self.size}/{self.max_size} tiles')
+
+    def _remove(self, path: str):
+        mtime, room = self.rooms.pop(path)
+        self.size -= room.get_size()
+        FOV.fov_cache.forget(room.name)
+
+# resized to the 'Room pool size' setting once a room is loaded
+room_pool = RoomPool(1000000)
+
+class RoomPrefetcher:
+    def __init__(self, pool: RoomPool):
+        self.pool = pool
+        self.queue = Queue()
+        self.thread = None
+        self.prefetched = 0
+        self.warm_transitions = 0
+        self.cold_transitions = 0
+
+    def count_transition(self, warm: bool):
+        if warm:
+            self.warm_transitions += 1
+        else:
+            self.cold_transitions += 1
+
+    def log_stats(self):
+        logging.debug(f'room prefetcher: {self.prefetched} rooms prefetched, {self.warm_transitions} warm and {self.cold_transitions} cold door transitions')
+
+    def prefetch(self, room: Room, config_file: ConfigFile):
+        depth = int(config_file.get('Prefetch depth'))
+        if depth <= 0:
+            return
+        # measured in tiles, same as the pool
+        max_size = self.pool.max_size
+        if config_file.has('Prefetch tile cap'):
+            max_size = int(config_file.get('Prefetch tile cap'))
+        if self.thread == None:
+            self.thread = Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.queue.put([room, depth, max_size, config_file])
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            # only the most recently entered room is worth prefetching around
+            while not self.queue.empty():
+                task = self.queue.get()
+            room, depth, max_size, config_file = task
+            self._prefetch_neighbors(room, depth, max_size, config_file)
+
+    def _prefetch_neighbors(self, room: Room, depth: int, max_size: int, config_file: ConfigFile):
+        r_p = config_file.get('Rooms path')
+        visited = [room.name]
+        layer = [room]
+        size = 0
+        for _ in range(depth):
+            next_layer = []
+            for current in layer:
+                for name in current.get_door_destinations():
+                    if name in visited:
+                        continue
+                    visited += [name]
+                    if not self.queue.empty():
+                        # player already moved on
+                        return
+                    path, source = Room.find_source(name, r_p)
+                    if path == None:
+                        continue
+                    neighbor = self.pool.peek(path)
+                    if neighbor == None:
+                        # broken rooms are reported when the player actually enters them
+                        try:
+                            neighbor_size = Room.peek_size(name, path, config_file)
+                        except Exception:
+                            continue
+                        if size + neighbor_size > max_size:
+                            return
+                        try:
+                            neighbor = Room.load_template(name, path, config_file)
+                        except Exception:
+                            continue
+                        size += neighbor_size
+                        self.pool.put(path, neighbor, source)
+                        self.prefetched += 1
+                    next_layer += [neighbor]
+            layer = next_layer
+
+room_prefetcher = RoomPrefetcher(room_pool)
+
+class CompiledRoom:
+    # bump when the compiled layout changes, so that old cache files get rebuilt
+    VERSION = 2
+
+    def __init__(self, name: str):
+        self.name = name
+        self.layout = []
+        self.tiles_data = {}
+        self.scripts = {}
+        self.containers = {}
+        self.enemies = {}
+        self.visible_range = 0
+        self.display_name = ''
+        # indexes built while parsing
+        self.doors = {}
+        self.spawn_markers = {}
+        self.tile_positions = {}
+
+    def from_text(name: str, raw_data: str):
         data = raw_data.split('\n---\n')
         if len(data) != 6:
             raise Exception(f'ERR: Incorrect room file format. Room name: {name}')
@@ -119,67 +663,46 @@ class Room:
         containers_data = data[4]
         enemies_data = data[5]
         tiles_data = tiles_raw_data.split('\n')
-        result = Room.from_str(name, layout_data, tiles_data, room_data, scripts_data, containers_data, enemies_data, '@', config_file, door_code, env_vars)
-        return result
+        return CompiledRoom.from_sections(name, layout_data, tiles_data, room_data, scripts_data, containers_data, enemies_data)
 
-    def from_str(name: str, layout_data: dict, raw_tiles_data: dict, room_data: dict, scripts_data: dict, containers_data: dict, enemies_data: dict, player_spawn_char: str, config_file: ConfigFile, door_code: str, env_vars: dict):
-        lines = layout_data.split('\n')
-        height = len(lines)
-        width = len(lines[0])
-        result = Room('', height, width)
-        result.name = name
+    def from_sections(name: str, layout_data: str, raw_tiles_data: list[str], room_data: str, scripts_data: str, containers_data: str, enemies_data: str):
+        result = CompiledRoom(name)
+        result.layout = layout_data.split('\n')
 
         # scripts
-        result.scripts = dict()
         for chunk in scripts_data.split('\n\n'):
             l = chunk.split('\n')
             script_name = l[0][:-1]
             script_lines = l[1:]
             result.scripts[script_name] = script_lines
-        
+
         # chest contents
-        result.container_info = dict()
         for chunk in containers_data.split('\n\n'):
             l = chunk.split('\n')
             container_code = l[0][:-1]
             raw_container_info = l[1:]
-            d = dict()
-            for i in range(len(raw_container_info)):
-                raw_item = raw_container_info[i]
+            items = []
+            for raw_item in raw_container_info:
                 sri = raw_item.split(' ')
-                item = None
                 if sri[0].isdigit():
-                    amount = int(sri[0])
-                    item_name = ' '.join(sri[1:])
-                    if item_name == 'Gold':
-                        item = Items.GoldPouch()
-                    else:
-                        item = Items.Item.get_base_items([item_name], config_file.get('Items path'))[0]
-                    item.amount = amount
-                    d[item] = f'{container_code}_{i}'
-                else: 
-                    item_name = ' '.join(sri)
-                    item = Items.Item.get_base_items([item_name], config_file.get('Items path'))[0]
-                    d[item] = f'{container_code}_{i}'
-                if item == None:
-                    data = ' '.join(sri)
-                    raise Exception(f'ERR: item with data {data} not parsable')
-            result.container_info[container_code] = d
-        
+                    items += [[int(sri[0]), ' '.join(sri[1:])]]
+                else:
+                    items += [[None, ' '.join(sri)]]
+            result.containers[container_code] = items
+
         # enemy data
-        result.enemies_data = dict()
         if len(enemies_data) != 0:
             for chunk in enemies_data.split('\n\n'):
                 l = chunk.split('\n')
                 enemy_code = l[0][:-1]
                 enemy_data = l[1:]
+                e_type = None
                 y = None
                 x = None
-                enemy = Enemy()
                 for line in enemy_data:
                     d = line.split('=')
                     if d[0] == 'e_type':
-                        enemy = Enemy.from_enemy_name(d[1], config_file)
+                        e_type = d[1]
                     if d[0] == 'y':
                         y = int(d[1])
                     if d[0] == 'x':
@@ -188,37 +711,8 @@ class Room:
                     raise Exception(f'ERR: y not defined when defining enemy')
                 if x == None:
                     raise Exception(f'ERR: x not defined when defining enemy')
-                enemy.y = y
-                enemy.x = x
-                var_start = f'enemies_{name}_{enemy_code}_'
-                # fill the values from env_vars
-                # y pos
-                var = f'{var_start}y'
-                if var in env_vars:
-                    enemy.y = env_vars[var]
-                env_vars[var] = enemy.y
-                # x pos
-                var = f'{var_start}x'
-                if var in env_vars:
-                    enemy.x = env_vars[var]
-                env_vars[var] = enemy.x
-
-                # health
-                var = f'{var_start}health'
-                if var in env_vars:
-                    enemy.health = env_vars[var]
-                env_vars[var] = enemy.health
-
-                enemy.max_mana = enemy.mana
-                # mana
-                var = f'{var_start}mana'
-                if var in env_vars:
-                    enemy.mana = env_vars[var]
-                env_vars[var] = enemy.mana
-                # if enemy.health > 0:
-                result.enemies_data[enemy_code] = enemy
-
-        tiles_data = dict()
+                result.enemies[enemy_code] = [e_type, y, x]
+
         # parse tile data
         for data_line in raw_tiles_data:
             if data_line == '':
@@ -227,29 +721,9 @@ class Room:
             key = d[0]
             char = d[1]
             tile_name = ' '.join(d[2].split('_'))
-            tiles_data[key] = [tile_name, char, d[3 : len(d)]]
-
-        # file the layout
-        result.tiles = []
-        for i in range(height):
-            result.tiles += [[]]
-            for j in range(width):
-                result.tiles[i] += [Tile.from_info(lines[i][j], tiles_data, result.scripts, result.container_info, config_file)]
-
-        # find the player spawn point
-        if not door_code:
-            result.player_spawn_y = 1
-            result.player_spawn_x = 1
-            for i in range(height):
-                for j in range(width):
-                    if lines[i][j] == player_spawn_char:
-                        result.player_spawn_y, result.player_spawn_x = i, j
-        else:
-            for i in range(height):
-                for j in range(width):
-                    if isinstance(result.tiles[i][j], DoorTile) and result.tiles[i][j].door_code == door_code or (isinstance(result.tiles[i][j], HiddenTile) and isinstance(result.tiles[i][j].actual_tile, DoorTile) and result.tiles[i][j].actual_tile.door_code == door_code):
-                        result.player_spawn_y, result.player_spawn_x = i, j
+            result.tiles_data[key] = [tile_name, char, d[3 : len(d)]]
 
+        result.build_indexes()
 
         split = room_data.split()
         for line in split:
@@ -258,4 +732,71 @@ class Room:
                 result.visible_range = int(s[1])
             if s[0] == 'display_name':
                 result.display_name = s[1]
-        return result
\ No newline at end of file
+        return result
+
+    def build_indexes(self):
+        # door codes of the tile chars, hidden doors included
+        door_codes = dict()
+        for key in self.tiles_data:
+            tile_name, char, args = self.tiles_data[key]
+            if tile_name == 'door':
+                door_codes[key] = args[1]
+            if tile_name == 'hidden tile' and len(args) > 4 and ' '.join(args[2].split('_')) == 'door':
+                door_codes[key] = args[4]
+        width = len(self.layout[0])
+        for i in range(len(self.layout)):
+            line = self.layout[i][:width]
+            for j in range(len(line)):
+                tile_char = line[j]
+                if tile_char == ' ' or tile_char == '#':
+                    continue
+                # the last occurrence wins, same as the full scans did
+                self.spawn_markers[tile_char] = [i, j]
+                if tile_char == '@' or not tile_char in self.tiles_data:
+                    continue
+                if tile_char in door_codes:
+                    self.doors[door_codes[tile_char]] = [i, j]
+                tile_name = self.tiles_data[tile_char][0]
+                if not tile_name in self.tile_positions:
+                    self.tile_positions[tile_name] = []
+                self.tile_positions[tile_name] += [[i, j]]
+
+    def json(self):
+        return self.__dict__
+
+    def from_json(js: dict):
+        result = CompiledRoom(js['name'])
+        result.__dict__ = js
+        return result
+
+    def load(name: str, path: str, cache_path: str=None):
+        if cache_path == None:
+            return CompiledRoom.from_text(name, open(path, 'r').read())
+        st = stat(path)
+        cache_file = CompiledRoom._cache_file_name(path, cache_path)
+        try:
+            cached = json.loads(open(cache_file, 'r').read())
+            if cached['version'] == CompiledRoom.VERSION and cached['source'] == abspath(path) and cached['mtime'] == st.st_mtime_ns and cached['size'] == st.st_size:
+                return CompiledRoom.from_json(cached['room'])
+        except (OSError, ValueError, KeyError):
+            pass
+        result = CompiledRoom.from_text(name, open(path, 'r').read())
+        data = dict()
+        data['version'] = CompiledRoom.VERSION
+        data['source'] = abspath(path)
+        data['mtime'] = st.st_mtime_ns
+        data['size'] = st.st_size
+        data['room'] = result.json()
+        try:
+            makedirs(cache_path, exist_ok=True)
+            # write to a temporary file first, so that a crash never leaves a half-written cache behind
+            tmp_file = f'{cache_file}.{get_ident()}.tmp'
+            open(tmp_file, 'w').write(json.dumps(data))
+            replace(tmp_file, cache_file)
+        except OSError:
+            pass
+        return result
+
+    def _cache_file_name(path: str, cache_path: str):
+        key = sha1(abspath(path).encode('utf-8')).hexdigest()[:16]
+        return join(cache_path, f'{splitext(basename(path))[0]}_{key}.rcache')
@@ -1,8 +1,9 @@
 import json
-from os import listdir, remove
-from os.path import isfile, join, splitext
+from os import remove
+from os.path import splitext
 
 from gamelib.Entities import Player
+from gamelib.DirectoryIndex import DirectoryIndex
 
 def save(player: Player, room_name: str, saves_path: str, player_y: int=-1, player_x: int=-1, env_vars: dict=dict(), game_log_messages: list[str]=[]):
     data = dict()
@@ -15,16 +16,16 @@ def save(player: Player, room_name: str, saves_path: str, player_y: int=-1, play
     if player_x != -1:
         data['player_x'] = player_x
     open(f'{saves_path}/{player.name}.save', 'w').write(json.dumps(data, indent=4, sort_keys=True))
+    _get_save_index(saves_path).invalidate()
 
 def load(name: str, saves_path: str):
-    files = _get_save_file_names(saves_path)
-    if not f'{name}.save' in files:
+    path = _get_save_index(saves_path).get_path(name)
+    if path == None:
         return -1
-    return json.loads(open(f'{saves_path}/{name}.save', 'r').read())
+    return json.loads(open(path, 'r').read())
 
 def save_file_exists(saves_path: str, name: str):
-    files = _get_save_file_names(saves_path)
-    return f'{name}.save' in files
+    return _get_save_index(saves_path).has(name)
 
 def save_descriptions(saves_path: str):
     result = []
@@ -42,16 +43,19 @@ def save_descriptions(saves_path: str):
     return result, corrupt_files
 
 def count_saves(saves_path: str):
-    return len(listdir(saves_path))
+    return len(_get_save_index(saves_path).get_names())
+
+def _get_save_index(saves_path: str):
+    return DirectoryIndex.get(saves_path, '.save')
 
 def _get_save_file_names(saves_path: str):
-    return [f for f in listdir(saves_path) if isfile(join(saves_path, f)) and splitext(f)[1] == '.save']
+    return _get_save_index(saves_path).get_file_names()
 
 def character_names(saves_path: str):
-    return [splitext(f)[0] for f in listdir(saves_path) if isfile(join(saves_path, f)) and splitext(f)[1] == '.save']
+    return _get_save_index(saves_path).get_names()
 
 def delete_save_file(name: str, saves_path: str):
     if not name in character_names(saves_path):
         raise Exception(f'ERR: No save file {name}.save, could not delete')
     remove(f'{saves_path}/{name}.save')
-    
\ No newline at end of file
+    _get_save_index(saves_path).invalidate()
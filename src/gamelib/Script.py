@@ -0,0 +1,181 @@
+import gamelib.EnvVars as EnvVars
+
+# operand kinds
+CONST = 0
+# env var slots, player values are bound into the same store
+VAR = 1
+# values that could not be parsed, they fail when they are read
+INVALID = 2
+
+# comparisons understood by if, any other operator leaves the condition false
+COMPARISONS = ['==', '>', '<', '>=', '<=']
+
+class Instruction:
+    def __init__(self, opcode: str, command: str, args: tuple):
+        self.opcode = opcode
+        # the first word of the line, the game keeps the last executed one in last_command
+        self.command = command
+        self.args = args
+        # the line the instruction was compiled from and its number in the script, for the script profiler
+        self.source = None
+        self.line = None
+
+def compile_value(s: str):
+    try:
+        return _compile_value(s)
+    except Exception as ex:
+        return (INVALID, ex)
+
+def _compile_value(s: str):
+    # literals are resolved here, everything else is looked up when executed
+    if s.lstrip('-').isdigit():
+        return (CONST, int(s))
+    if s[0] == '"' and s[len(s) - 1] == '"':
+        return (CONST, s[1:len(s) - 1])
+    if s.lower() == 'true':
+        return (CONST, True)
+    if s.lower() == 'false':
+        return (CONST, False)
+    return (VAR, EnvVars.intern(s))
+
+def compile_script(lines: list[str]):
+    # line numbers count from 1, the first line after the script's name
+    result = []
+    for i in range(len(lines)):
+        if lines[i] == '':
+            continue
+        instruction = compile_line(lines[i])
+        instruction.line = i + 1
+        result += [instruction]
+    return result
+
+def compile_scripts(scripts: dict):
+    result = dict()
+    for name in scripts:
+        result[name] = compile_script(scripts[name])
+    return result
+
+def compile_line(line: str):
+    try:
+        result = _compile_line(line)
+        result.source = line
+        return result
+    except Exception as ex:
+        # a broken line only fails once it is executed, same as when scripts were interpreted line by line
+        command = None
+        words = line.split()
+        if len(words) > 0 and line[0] != '#':
+            command = words[0]
+        result = Instruction('error', command, ex)
+        result.source = line
+        return result
+
+def _compile_line(line: str):
+    if line[0] == '#':
+        return Instruction('comment', None, ())
+    words = line.split()
+    command = words[0]
+    if command == 'run':
+        return Instruction('run', command, (words[1],))
+    if command == 'set':
+        value = ' '.join(words[2:])
+        return Instruction('set', command, (words[1], EnvVars.intern(words[1]), value, compile_value(value)))
+    if command == 'unset':
+        return Instruction('unset', command, (words[1], EnvVars.intern(words[1])))
+    if command == 'add':
+        var = words[1]
+        value = ' '.join(words[2:])
+        real_value = compile_value(value)
+        if var == 'player.inventory' or var == 'player.items':
+            sp = value.split(' ')
+            if sp[0].isdigit():
+                return Instruction('add_item', command, (int(sp[0]), compile_value(' '.join(sp[1:]))))
+            return Instruction('add_item', command, (None, real_value))
+        return Instruction('add', command, (var, EnvVars.intern(var), real_value))
+    if command == 'sub':
+        value = words[2]
+        if not value.isdigit():
+            raise Exception(f'ERR: {value} is not a digit')
+        return Instruction('sub', command, (words[1], EnvVars.intern(words[1]), int(value)))
+    if command == 'mb':
+        var = ' '.join(words[2:])
+        return Instruction('mb', command, (words[1].split('|'), var, compile_value(var)))
+    if command == 'notify':
+        return Instruction('notify', command, (compile_value(' '.join(words[1:])),))
+    if command == 'say':
+        replies = [' '.join(r.split('_')) for r in words[1].split('|')]
+        var = ' '.join(words[2:])
+        return Instruction('say', command, (replies, var, compile_value(var)))
+    if command == 'log':
+        return Instruction('log', command, (compile_value(' '.join(words[1:])),))
+    if command == 'move':
+        return Instruction('move', command, (words[1], int(words[2]), int(words[3])))
+    if command == 'kill' or command == 'revive':
+        return Instruction(command, command, (words[1],))
+    if command == 'sleep':
+        # the amount is only parsed after the tile window is drawn
+        return Instruction('sleep', command, (words[1:],))
+    if command == 'clear':
+        return Instruction('clear', command, (words[1],))
+    if command == 'if':
+        return _compile_if(words)
+    if command == 'fight':
+        return Instruction('fight', command, (words[1],))
+    if command == 'trade':
+        return Instruction('trade', command, (words[1], words[2]))
+    if command == 'draw' or command == 'stop':
+        return Instruction(command, command, ())
+    if command == 'return':
+        return Instruction('return', command, (compile_value(' '.join(words[1:])),))
+    # unknown commands are kept, so that the error comes up when the line is reached
+    return Instruction('unknown', command, (command,))
+
+def _compile_if(words: list[str]):
+    command = words.pop(0)
+    reverse = False
+    if words[0] == 'not':
+        reverse = True
+        words.pop(0)
+    # each check overrides the previous one, same as in the interpreter
+    condition = ('none',)
+    if words[0] == 'set':
+        condition = ('set', EnvVars.intern(words[1]))
+    if words[1] in COMPARISONS:
+        var2 = ' '.join(words[2:words.index('then')])
+        condition = ('compare', words[1], compile_value(words[0]), compile_value(var2))
+    if words[1] == 'in':
+        condition = ('in', EnvVars.intern(words[0]), words[2])
+    if 'then' in words:
+        branch = compile_line(' '.join(words[words.index('then') + 1:]))
+    else:
+        # only fails when the condition holds
+        branch = Instruction('error', None, ValueError('\'then\' is not in list'))
+    return Instruction('if', command, (reverse, condition, branch))
+
+def get_condition_reads(instructions: list):
+    # slots read by the if conditions of a script, None if a condition depends on more than plain env vars
+    result = set()
+    for instruction in instructions:
+        if not _add_condition_reads(instruction, result):
+            return None
+    return result
+
+def _add_condition_reads(instruction: Instruction, result: set):
+    if instruction.opcode != 'if':
+        return True
+    reverse, condition, branch = instruction.args
+    kind = condition[0]
+    if kind == 'set':
+        result.add(condition[1])
+    if kind == 'compare':
+        for operand in condition[2:]:
+            if operand[0] == INVALID:
+                return False
+            # dotted names are player values and container lengths, they change without the vars changing
+            if operand[0] == VAR and '.' in EnvVars.get_name(operand[1]):
+                return False
+            if operand[0] == VAR:
+                result.add(operand[1])
+    if kind == 'in':
+        return False
+    return _add_condition_reads(branch, result)
@@ -0,0 +1,66 @@
+class SpatialHash:
+    def __init__(self, cell_size: int=8):
+        # keys are bucketed into cell_size x cell_size squares of the room
+        self.cell_size = cell_size
+        self.cells = dict()
+        self.positions = dict()
+        # bumped on every change, so that results computed from the index can be cached
+        self.version = 0
+
+    def has(self, key):
+        return key in self.positions
+
+    def insert(self, key, y: int, x: int):
+        if key in self.positions:
+            self.remove(key)
+        cell = (y // self.cell_size, x // self.cell_size)
+        if not cell in self.cells:
+            self.cells[cell] = set()
+        self.cells[cell].add(key)
+        self.positions[key] = (y, x)
+        self.version += 1
+
+    def remove(self, key):
+        if not key in self.positions:
+            return
+        y, x = self.positions.pop(key)
+        cell = (y // self.cell_size, x // self.cell_size)
+        self.cells[cell].discard(key)
+        if len(self.cells[cell]) == 0:
+            self.cells.pop(cell)
+        self.version += 1
+
+    def move(self, key, y: int, x: int):
+        if self.positions.get(key) == (y, x):
+            return
+        self.insert(key, y, x)
+
+    def clear(self):
+        self.cells = dict()
+        self.positions = dict()
+        self.version += 1
+
+    def query_rect(self, y_from: int, x_from: int, y_to: int, x_to: int):
+        # keys inside the rectangle, both corners included
+        result = []
+        size = self.cell_size
+        for cy in range(y_from // size, y_to // size + 1):
+            for cx in range(x_from // size, x_to // size + 1):
+                if not (cy, cx) in self.cells:
+                    continue
+                for key in self.cells[(cy, cx)]:
+                    y, x = self.positions[key]
+                    if y >= y_from and y <= y_to and x >= x_from and x <= x_to:
+                        result += [key]
+        return result
+
+    def query_radius(self, y: int, x: int, radius):
+        # keys at most radius away from y, x
+        r = int(radius)
+        rr = radius * radius
+        result = []
+        for key in self.query_rect(y - r, x - r, y + r, x + r):
+            ky, kx = self.positions[key]
+            if (ky - y) * (ky - y) + (kx - x) * (kx - x) <= rr:
+                result += [key]
+        return result
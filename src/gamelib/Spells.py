@@ -1,7 +1,8 @@
-import json
+from copy import deepcopy
 from ncursesui.Utility import message_box, str_smart_split, split_dict
 import gamelib.Entities as Entities
 import gamelib.Combat as Combat
+import gamelib.Content as Content
 
 class Spell:
     def __init__(self):
@@ -28,6 +29,12 @@ class Spell:
     def get_cct_display_text(self):
         return self.name
 
+    def copy(self):
+        # nested values are copied too, prototypes must not change through their copies
+        result = Spell.get_template_from_type(self.type)
+        result.__dict__ = deepcopy(self.__dict__)
+        return result
+
     # static methods
 
     def get_template_from_type(t: str):
@@ -44,7 +51,8 @@ class Spell:
     def from_json(js):
         t = js['type']
         result = Spell.get_template_from_type(t)
-        result.__dict__ = js
+        # js can be the catalog's own data
+        result.__dict__ = deepcopy(js)
         return result
 
     def arr_to_json(spells: list['Spell']):
@@ -54,10 +62,9 @@ class Spell:
         return result
 
     def get_base_spells(names: list[str], path: str):
-        data = json.loads(open(path, 'r').read())
         result = []
         for item_name in names:
-            result += [Spell.from_json(data[item_name])]
+            result += [Content.registry.get_prototype(path, item_name, Spell.from_json).copy()]
         return result
 
 class NormalSpell(Spell):
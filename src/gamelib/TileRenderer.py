@@ -0,0 +1,85 @@
+from Profiler import profiler
+
+BLANK = (' ', 0)
+
+class TileRenderer:
+    def __init__(self, window, y: int, x: int, height: int, width: int):
+        # keeps the cells last drawn to the height x width region of window starting at y, x,
+        # so that a frame only writes the cells that changed since the previous one
+        self.window = window
+        self.y = y
+        self.x = x
+        self.height = height
+        self.width = width
+        # front is what the window holds (None when unknown), back is the frame being drawn
+        self.front = [None] * (height * width)
+        self.back = [BLANK] * (height * width)
+        self.stale = True
+        self.cells_written = 0
+        # guessed from the cursor moves and attribute switches, curses decides what is actually sent
+        self.bytes_estimate = 0
+
+    def is_stale(self):
+        return self.stale
+
+    def invalidate(self):
+        # the whole window has to be redrawn from scratch
+        self.stale = True
+        self.front = [None] * (self.height * self.width)
+
+    def clear(self):
+        # the window was just erased
+        self.stale = False
+        self.front = [BLANK] * (self.height * self.width)
+
+    def damage(self, y: int, x: int, length: int=1):
+        # something was drawn over these cells without the renderer knowing what
+        i = y - self.y
+        if i < 0 or i >= self.height:
+            return
+        start = max(0, x - self.x)
+        end = min(self.width, x - self.x + length)
+        for j in range(start, end):
+            self.front[i * self.width + j] = None
+
+    def begin(self):
+        self.back = [BLANK] * (self.height * self.width)
+
+    def addch(self, y: int, x: int, ch: str, attr: int=0):
+        self.back[(y - self.y) * self.width + x - self.x] = (ch, attr)
+
+    def flush(self):
+        front = self.front
+        back = self.back
+        cells = 0
+        written = 0
+        for i in range(self.height):
+            start = i * self.width
+            end = start + self.width
+            if back[start:end] == front[start:end]:
+                continue
+            y = self.y + i
+            # rough estimate of what the terminal receives: a cursor move per run of changed cells,
+            # an attribute switch whenever the attribute changes and the characters themselves
+            next_j = -1
+            last_attr = None
+            for j in range(start, end):
+                cell = back[j]
+                if cell == front[j]:
+                    continue
+                ch, attr = cell
+                x = self.x + j - start
+                self.window.addch(y, x, ch, attr)
+                front[j] = cell
+                cells += 1
+                if j != next_j:
+                    written += len(f'\x1b[{y + 1};{x + 1}H')
+                if attr != last_attr:
+                    written += 4
+                    last_attr = attr
+                written += len(ch.encode('utf-8'))
+                next_j = j + 1
+        self.cells_written = cells
+        self.bytes_estimate = written
+        profiler.count('tile cells written', cells)
+        profiler.count('tile bytes (estimate)', written)
@@ -1,9 +1,11 @@
 import curses
 from ncursesui.Elements import Window
 
-from ncursesui.Utility import cct_len, cct_real_str, draw_borders, draw_separator, message_box, put, show_controls_window
+from ncursesui.Utility import cct_real_str, draw_borders, draw_separator, message_box, put, show_controls_window
 from gamelib.Entities import Player
 from gamelib.Items import CountableItem, Item
+import gamelib.Render as Render
+import gamelib.Markup as Markup
 
 class Trade:
     controls = {
@@ -48,20 +50,20 @@ class Trade:
 
         self.player_window_height = self.HEIGHT
         self.player_window_width = self.WIDTH // 3
-        self.player_window = curses.newwin(self.player_window_height, self.player_window_width, 0, 0)
+        self.player_window = Render.newwin(self.player_window_height, self.player_window_width, 0, 0)
         self.player_window.keypad(1)
 
         self.vendor_window_height = self.HEIGHT
         self.vendor_window_width = self.player_window_width
-        self.vendor_window = curses.newwin(self.vendor_window_height, self.vendor_window_width, 0, self.WIDTH - self.player_window_width)
+        self.vendor_window = Render.newwin(self.vendor_window_height, self.vendor_window_width, 0, self.WIDTH - self.player_window_width)
 
         self.player_info_window_height = self.HEIGHT // 2 - 1
         self.player_info_window_width = self.WIDTH - 2 * self.player_window_width
-        self.player_info_window = curses.newwin(self.player_info_window_height, self.player_info_window_width, 0, self.player_window_width)
+        self.player_info_window = Render.newwin(self.player_info_window_height, self.player_info_window_width, 0, self.player_window_width)
 
         self.vendor_info_window_height = self.HEIGHT - self.player_info_window_height
         self.vendor_info_window_width = self.player_info_window_width
-        self.vendor_info_window = curses.newwin(self.vendor_info_window_height, self.vendor_info_window_width, self.player_info_window_height, self.player_window_width)
+        self.vendor_info_window = Render.newwin(self.vendor_info_window_height, self.vendor_info_window_width, self.player_info_window_height, self.player_window_width)
 
     def get_key(self):
         return self.player_window.getch()
@@ -93,11 +95,11 @@ class Trade:
                 # finish trading
                 if self.get_player_final_gold() < 0:
                     put(self.player_window, self.player_window_height - 3, 1, f'#black-red Not enough gold')
-                    self.player_window.refresh()
+                    Render.compositor.show(self.player_window)
                     continue
                 if self.get_vendor_final_gold() < 0:
                     put(self.vendor_window, self.vendor_window_height - 3, 1, f'#black-red Not enough gold')
-                    self.vendor_window.refresh()
+                    Render.compositor.show(self.vendor_window)
                     continue
                 answer = message_box(self.parent, 'Finish trading?', ['No', 'Yes'])
                 if answer == 'Yes':
@@ -134,10 +136,10 @@ class Trade:
         pfg = self.get_player_final_gold()
         # amount window
         window_height = 7
-        window_width = cct_len(top) + 2
+        window_width = Markup.cct_len(top) + 2
         window_y = self.HEIGHT // 2 - window_height // 2
         window_x = self.WIDTH // 2 - window_width // 2
-        window = curses.newwin(window_height, window_width, window_y, window_x)
+        window = Render.newwin(window_height, window_width, window_y, window_x)
         window.keypad(1)
         while True:
             # draw
@@ -158,8 +160,8 @@ class Trade:
                 price, 
                 'red-black' if fp < 0 else 'yellow-black', 
                 fp)
-            put(window, 2, window_width // 2 - cct_len(bottom) // 2, bottom)
-            window.refresh()
+            put(window, 2, window_width // 2 - Markup.cct_len(bottom) // 2, bottom)
+            Render.compositor.show(window)
             # 
             key = self.get_key()
             if key == 27: # ESC
@@ -314,7 +316,7 @@ class Trade:
         window_width = self.WIDTH // 4 * 3
         window_y = self.HEIGHT // 2 - window_height // 2
         window_x = self.WIDTH // 2 - window_width // 2
-        window = curses.newwin(window_height, window_width, window_y, window_x)
+        window = Render.newwin(window_height, window_width, window_y, window_x)
         window.keypad(1)
 
         desc = item.get_description(window_width - 2)
@@ -325,7 +327,7 @@ class Trade:
             put(window, 0, 1, f'#yellow-black Item description')
             for i in range(len(desc)):
                 put(window, i + 1, 1, desc[i])
-            window.refresh()
+            Render.compositor.show(window)
 
             key = self.get_key()
             if key == 27 or key == 32: # ESC/SPACE
@@ -371,15 +373,12 @@ class Trade:
         self.draw_player_info_window()
         self.draw_vendor_info_window()
 
-        self.player_window.refresh()
-        self.vendor_window.refresh()
-        self.player_info_window.refresh()
-        self.vendor_info_window.refresh()
+        Render.compositor.show(self.player_window, self.vendor_window, self.player_info_window, self.vendor_info_window)
 
     def draw_player_window(self):
         self.player_window.erase()
         draw_borders(self.player_window, 'black-white' if self.selling else 'normal')
-        put(self.player_window, 0, 1, f'#green-black {self.player.name} #normal items')
+        Markup.put(self.player_window, 0, 1, f'#green-black {self.player.name} #normal items')
 
         # display items
         flag = self.selling and not self.info_window_selected
@@ -396,7 +395,7 @@ class Trade:
             elif i in self.sold_item_ids:
                 color = HCOLOR
             attr = curses.A_REVERSE if flag and self.choice == i else 0
-            put(self.player_window, 2 + i, 2, f'{color} {cct_real_str(display_names[i]) if color == HCOLOR else display_names[i]}', attr)
+            Markup.put(self.player_window, 2 + i, 2, f'{color} {cct_real_str(display_names[i]) if color == HCOLOR else display_names[i]}', attr)
 
         # draw gold info
         draw_separator(self.player_window, self.player_window_height - 3, 'black-white' if self.selling else 'normal')
@@ -410,12 +409,12 @@ class Trade:
         final_value = self.player.gold + sold_value - bought_value
         if final_value != self.player.gold:
             gold_str += '#normal = #{} {}'.format('red-black' if final_value < 0 else 'yellow-black', final_value)
-        put(self.player_window, self.player_window_height - 2, 1, gold_str)
+        Markup.put(self.player_window, self.player_window_height - 2, 1, gold_str)
 
     def draw_vendor_window(self):
         self.vendor_window.erase()
         draw_borders(self.vendor_window, 'black-white' if not self.selling else 'normal')
-        put(self.vendor_window, 0, 1, f'#cyan-black {self.vendor_name} #normal items')
+        Markup.put(self.vendor_window, 0, 1, f'#cyan-black {self.vendor_name} #normal items')
 
         # display items
         flag = not self.selling and not self.info_window_selected
@@ -432,7 +431,7 @@ class Trade:
             elif i in self.bought_item_ids:
                 color = HCOLOR
             attr = curses.A_REVERSE if flag and self.choice == i else 0
-            put(self.vendor_window, 2 + i, 2, f'{color} {cct_real_str(display_names[i]) if color == HCOLOR else display_names[i]}', attr)
+            Markup.put(self.vendor_window, 2 + i, 2, f'{color} {cct_real_str(display_names[i]) if color == HCOLOR else display_names[i]}', attr)
         # draw gold info
         draw_separator(self.vendor_window, self.vendor_window_height - 3, 'black-white' if not self.selling else 'normal')
         gold_str = f'Gold: #yellow-black {self.vendor_gold} '
@@ -445,7 +444,7 @@ class Trade:
         final_value = self.vendor_gold + bought_value - sold_value
         if final_value != self.vendor_gold:
             gold_str += '#normal = #{} {}'.format('red-black' if final_value < 0 else 'yellow-black', final_value)
-        put(self.vendor_window, self.vendor_window_height - 2, 1, gold_str)
+        Markup.put(self.vendor_window, self.vendor_window_height - 2, 1, gold_str)
 
     def draw_player_info_window(self):
         self.player_info_window.erase()
@@ -0,0 +1,155 @@
+import time
+import gamelib.EnvVars as EnvVars
+import gamelib.Script as Script
+
+# opcodes that do nothing on their own, a _tick run that only executed these changed nothing
+PASSIVE_OPCODES = ['comment', 'if']
+
+# how many queued scripts can run before the triggers are considered to be looping
+MAX_RUNS = 256
+
+# a trigger script is named after its event, the rest of the name are the arguments
+TRIGGER_ARGS = {
+    '_on_change': 1,
+    '_on_enter': 2,
+    '_on_death': 1,
+    '_every': 1,
+    '_timer': 1
+}
+
+class RoomTriggers:
+    def __init__(self, room, env_vars, player_y: int, player_x: int):
+        self.room = room
+        self.env_vars = None
+        # slot -> script names
+        self.on_change = dict()
+        # (y, x) -> script names
+        self.on_enter = dict()
+        # enemy code -> script names
+        self.on_death = dict()
+        # [turns, script name]
+        self.every = []
+        # [ms, script name, next time it is due]
+        self.timers = []
+        self.pending = []
+        self.turns = 0
+        self.last_position = (player_y, player_x)
+        # slots _tick's conditions read, None if it can't be skipped
+        self.tick_reads = None
+        if '_tick' in room.compiled_scripts:
+            self.tick_reads = Script.get_condition_reads(room.compiled_scripts['_tick'])
+        self.tick_idle = False
+        now = time.monotonic()
+        for name in room.compiled_scripts:
+            words = name.split()
+            if not words[0] in TRIGGER_ARGS:
+                continue
+            if len(words) - 1 != TRIGGER_ARGS[words[0]]:
+                raise Exception(f'ERR: trigger script {name} in room {room.name} expects {TRIGGER_ARGS[words[0]]} arguments')
+            if words[0] == '_on_change':
+                self.add_to(self.on_change, EnvVars.intern(words[1]), name)
+            if words[0] == '_on_enter':
+                self.add_to(self.on_enter, (int(words[1]), int(words[2])), name)
+            if words[0] == '_on_death':
+                self.add_to(self.on_death, words[1], name)
+            if (words[0] == '_every' or words[0] == '_timer') and int(words[1]) < 1:
+                raise Exception(f'ERR: trigger script {name} in room {room.name} needs a positive amount')
+            if words[0] == '_every':
+                self.every += [[int(words[1]), name]]
+            if words[0] == '_timer':
+                ms = int(words[1])
+                self.timers += [[ms, name, now + ms / 1000]]
+        self.attach(env_vars)
+
+    def add_to(self, d: dict, key, name: str):
+        if not key in d:
+            d[key] = []
+        d[key] += [name]
+
+    def attach(self, env_vars):
+        self.detach()
+        self.env_vars = env_vars
+        for slot in self.on_change:
+            env_vars.subscribe(slot, self.on_var)
+        if self.tick_reads != None:
+            for slot in self.tick_reads:
+                env_vars.subscribe(slot, self.on_tick_read)
+
+    def detach(self):
+        if self.env_vars == None:
+            return
+        for slot in self.on_change:
+            self.env_vars.unsubscribe(slot, self.on_var)
+        if self.tick_reads != None:
+            for slot in self.tick_reads:
+                self.env_vars.unsubscribe(slot, self.on_tick_read)
+        self.env_vars = None
+
+    def on_var(self, slot: int, value):
+        for name in self.on_change[slot]:
+            self.queue(name)
+
+    def on_tick_read(self, slot: int, value):
+        self.tick_idle = False
+
+    def queue(self, name: str):
+        if not name in self.pending:
+            self.pending += [name]
+
+    def has_pending(self):
+        return len(self.pending) > 0
+
+    def pop_pending(self):
+        return self.pending.pop(0)
+
+    def clear_pending(self):
+        self.pending = []
+
+    # _tick
+
+    def should_tick(self):
+        return not self.tick_idle
+
+    def tick_finished(self, changed: bool):
+        # a run that changed nothing does the same until one of the vars it checks changes
+        self.tick_idle = not changed and self.tick_reads != None
+
+    # events
+
+    def enter_cell(self, y: int, x: int):
+        if self.last_position == (y, x):
+            return
+        self.last_position = (y, x)
+        if (y, x) in self.on_enter:
+            for name in self.on_enter[(y, x)]:
+                self.queue(name)
+
+    def enemy_died(self, enemy_code: str):
+        if enemy_code in self.on_death:
+            for name in self.on_death[enemy_code]:
+                self.queue(name)
+
+    def end_turn(self):
+        self.turns += 1
+        for turns, name in self.every:
+            if self.turns % turns == 0:
+                self.queue(name)
+
+    # timers
+
+    def has_timers(self):
+        return len(self.timers) > 0
+
+    def queue_timers(self):
+        now = time.monotonic()
+        for timer in self.timers:
+            if now >= timer[2]:
+                self.queue(timer[1])
+                timer[2] = now + timer[0] / 1000
+
+    def get_timeout(self):
+        # milliseconds until the next timer is due, -1 if there are none
+        if len(self.timers) == 0:
+            return -1
+        now = time.monotonic()
+        return max(0, int((min(timer[2] for timer in self.timers) - now) * 1000))
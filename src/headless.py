@@ -0,0 +1,98 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+from Configuraion import ConfigFile
+import gamelib.Render as Render
+import gamelib.Content as Content
+import gamelib.SaveFile as SaveFile
+import gamelib.Items as Items
+from gamelib.Entities import Player, Enemy
+from gamelib.Combat import CombatEncounter
+from gamelib.Trade import Trade
+import Game
+
+# runs the game, a combat encounter and a trade on the framebuffer backend with scripted keys
+# usage: python3 src/headless.py [-g golden frames dir] [-u]
+# with -g the last frame of each run is compared to the one saved in the dir, -u saves them instead
+
+HEIGHT = 50
+WIDTH = 160
+CHARACTER_NAME = 'headless'
+
+config_path = 'settings.config'
+golden_path = None
+if '-g' in sys.argv:
+    golden_path = sys.argv[sys.argv.index('-g') + 1]
+update_golden = '-u' in sys.argv
+
+def create_player(config_file: ConfigFile):
+    player = Player()
+    player.name = CHARACTER_NAME
+    player.load_class(Content.registry.get_data(config_file.get('Class schemas path'))['warrior'], config_file.get('Items path'))
+    return player
+
+def run_game(parent, config_file: ConfigFile):
+    player = create_player(config_file)
+    starting_room = 'index'
+    if config_file.has('Starting room'):
+        starting_room = config_file.get('Starting room')
+    SaveFile.save(player, starting_room, config_file.get('Saves path'))
+    Game.Game(parent, CHARACTER_NAME, config_file).start()
+
+def run_combat(parent, config_file: ConfigFile):
+    enemy_name = list(Content.registry.get_data(config_file.get('Enemy schemas path')))[0]
+    enemy = Enemy.from_enemy_name(enemy_name, config_file)
+    CombatEncounter(parent, create_player(config_file), enemy, 1, config_file).start()
+
+def run_trade(parent, config_file: ConfigFile):
+    items_path = config_file.get('Items path')
+    names = list(Content.registry.get_data(items_path))[:30]
+    items, countable_items = Items.Item.separate_items(Items.Item.get_base_items(names, items_path))
+    Trade(parent, create_player(config_file), 'Vendor', 100, items, countable_items).start()
+
+# name, function, keys
+RUNS = [
+    ['game', run_game, [10] * 3 + [259, 258, 260, 261, 261, 260, 258, 259] * 25 + [120, 259, 259, 260, 27, 105, 258, 258, 27]],
+    ['combat', run_combat, [258, 259, 10] * 20],
+    ['trade', run_trade, [258, 32, 258, 32, 9, 261, 258, 32, 260, 68, 27]]
+]
+
+def compare_golden(name: str, frame: list[str]):
+    path = os.path.join(golden_path, f'{name}.txt')
+    if update_golden:
+        os.makedirs(golden_path, exist_ok=True)
+        open(path, 'w').write('\n'.join(frame))
+        return 'saved'
+    if not os.path.exists(path):
+        return 'no golden frame'
+    if open(path, 'r').read().split('\n') == frame:
+        return 'same'
+    return 'DIFFERENT'
+
+config_file = ConfigFile(config_path)
+saves_path = tempfile.mkdtemp()
+config_file.set('Saves path', saves_path)
+failed = False
+try:
+    for name, run, keys in RUNS:
+        backend = Render.FrameBufferBackend(HEIGHT, WIDTH, keys)
+        backend.install()
+        random.seed(0)
+        start = perf_counter()
+        try:
+            run(Render.FrameBufferParent(backend), config_file)
+        except Render.InputExhausted:
+            pass
+        elapsed = perf_counter() - start
+        result = ''
+        if golden_path != None:
+            result = compare_golden(name, backend.get_frame())
+            failed = failed or result == 'DIFFERENT'
+        print(f'{name}: {len(keys) - len(backend.keys)} keys, {backend.frames} frames, {elapsed * 1000:.1f}ms, {backend.slept}ms slept {result}')
+finally:
+    shutil.rmtree(saves_path, ignore_errors=True)
+if failed:
+    sys.exit(1)
@@ -1,6 +1,9 @@
 import curses
 import Game
 from Configuraion import ConfigFile
+from Profiler import profiler
+from ScriptProfiler import script_profiler
+import gamelib.Room as Room
 import sys
 import os
 import curses
@@ -14,7 +17,18 @@ config_path = 'settings.config'
 def main(stdscr):
     curses.curs_set(0)
     gw = Game.GameWindow(stdscr, ConfigFile(config_path))
-    if '-d' in sys.argv: logging.basicConfig(filename='gamelog.log', level=logging.DEBUG)
-    gw.start()
+    if '-d' in sys.argv:
+        logging.basicConfig(filename='gamelog.log', level=logging.DEBUG)
+        script_profiler.enable()
+    if '-p' in sys.argv: profiler.enable()
+    try:
+        gw.start()
+    finally:
+        if profiler.enabled:
+            profiler.dump('profile.log')
+        if script_profiler.enabled:
+            script_profiler.dump('script_profile.log')
+        Room.room_pool.log_stats()
+        Room.room_prefetcher.log_stats()
 
 curses.wrapper(main)
\ No newline at end of file